@@ -1,7 +1,7 @@
 # -*- coding: utf-8 -*-
 {
     'name': 'Nimba SMS',
-    'version': '19.0.2.3.0',
+    'version': '19.0.2.4.0',
     'category': 'Discuss/SMS',
     'summary': 'Integration with Nimba SMS using official Python SDK',
     'sequence': 100,  # Load after other SMS modules
@@ -17,6 +17,7 @@
         ---------
         * Send SMS through official Nimba SMS SDK
         * Batch sending - multiple recipients in one request
+        * Load balancing across a pool of Nimba SMS accounts per company
         * Webhook support for delivery status callbacks
         * Multi-tenant support with per-database configuration
         * Phone number validation for African countries (default: Guinea)
@@ -50,6 +51,11 @@
     'data': [
         'security/ir.model.access.csv',
         'views/nimba_sms_account_wizard_view.xml',
+        'views/sms_nimba_account_views.xml',
+        'views/sms_nimba_batch_views.xml',
+        'views/sms_nimba_stats_views.xml',
+        'views/sms_nimba_invalid_number_views.xml',
+        'views/sms_nimba_optout_views.xml',
         'views/res_config_settings_views.xml',
     ],
     'images': [
@@ -0,0 +1,4 @@
+# -*- coding: utf-8 -*-
+
+from . import nimba_import_reports
+from . import nimba_sender
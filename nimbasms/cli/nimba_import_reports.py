@@ -0,0 +1,214 @@
+# -*- coding: utf-8 -*-
+
+import argparse
+import csv
+import io
+import itertools
+import json
+import logging
+import sys
+import time
+from collections import OrderedDict, defaultdict
+from pathlib import Path
+
+from psycopg2 import errors as pg_errors
+
+from odoo import SUPERUSER_ID, api
+from odoo.cli import Command
+from odoo.tools import config
+from odoo.addons.nimbasms.controllers.webhook import NimbaSmsWebhook
+
+_logger = logging.getLogger(__name__)
+
+NIMBA_REPORT_STATUSES = ('received', 'failed')
+CHUNK_ATTEMPTS = 3
+ROUTE_CACHE_SIZE = 100000
+
+
+class NimbaImportReports(Command):
+    """Apply an export of Nimba SMS delivery reports (NDJSON or CSV)"""
+
+    name = 'nimba_import_reports'
+
+    def run(self, cmdargs):
+        parser = argparse.ArgumentParser(
+            prog=f'{Path(sys.argv[0]).name} {self.name}',
+            description=(
+                "Apply Nimba SMS delivery reports exported as NDJSON or CSV "
+                "(fields: messageid, contact, status, error), e.g. after a webhook "
+                "outage. Reports are streamed, routed to the database holding their "
+                "batch and applied chunk by chunk, one transaction per chunk."
+            ),
+        )
+        parser.add_argument('file', help="Export to apply, '-' for stdin")
+        parser.add_argument('-c', '--config', dest='config', help="Odoo configuration file")
+        parser.add_argument('-d', '--database', dest='database',
+                            help="Comma-separated databases to route reports to (default: all)")
+        parser.add_argument('--format', choices=('auto', 'ndjson', 'csv'), default='auto',
+                            help="Format of the export (default: from the extension or the content)")
+        parser.add_argument('--chunk-size', type=int, default=5000,
+                            help="Reports matched and applied per transaction (default: %(default)s)")
+        parser.add_argument('--dry-run', action='store_true', help="Match the reports without applying them")
+        args = parser.parse_args(cmdargs)
+
+        odoo_args = ['-c', args.config] if args.config else []
+        config.parse_config(odoo_args, setup_logging=True)
+
+        if args.file == '-':
+            stream = io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8', newline='')
+            counters = NimbaReportImporter(args).run(stream)
+        else:
+            with open(args.file, encoding='utf-8', newline='') as stream:
+                counters = NimbaReportImporter(args).run(stream)
+        print(json.dumps(counters, indent=1))
+
+
+class NimbaReportImporter:
+    """
+    Stream delivery reports and apply them in chunks.
+
+    Memory stays bounded by the chunk size: reports are read lazily, each
+    chunk is routed with one probe per database (``messageid`` -> database,
+    cached), matched with ``sms.sms._nimba_match_delivery_reports`` and
+    applied with ``sms.sms._nimba_apply_delivery_reports`` in its own
+    transaction, i.e. the same matching and effects as the webhook.
+    """
+
+    def __init__(self, args):
+        self.args = args
+        self.routes = OrderedDict()  # messageid -> database
+        self.counters = dict.fromkeys(('read', 'invalid', 'unrouted', 'unmatched', 'duplicate', 'applied'), 0)
+
+    def _get_databases(self):
+        from odoo.service import db
+
+        if self.args.database:
+            return [name.strip() for name in self.args.database.split(',') if name.strip()]
+        return db.list_dbs(True)
+
+    def _iter_reports(self, stream):
+        """Yield the reports of the export as dicts."""
+        lines = iter(stream)
+        first_line = next(lines, '')
+        lines = itertools.chain([first_line], lines)
+        report_format = self.args.format
+        if report_format == 'auto':
+            suffix = Path(self.args.file).suffix.lower()
+            if suffix == '.csv':
+                report_format = 'csv'
+            elif suffix in ('.ndjson', '.jsonl', '.json'):
+                report_format = 'ndjson'
+            else:
+                report_format = 'ndjson' if first_line.lstrip().startswith('{') else 'csv'
+
+        if report_format == 'csv':
+            yield from csv.DictReader(lines)
+            return
+        for line in lines:
+            if not line.strip():
+                continue
+            try:
+                report = json.loads(line)
+            except ValueError:
+                report = None
+            yield report if isinstance(report, dict) else {}
+
+    def _route(self, databases, messageids):
+        """
+        Return {database: set of messageids} for the given messageids,
+        probing the databases (without loading their registry) for the
+        ones not routed yet.
+        """
+        routed = defaultdict(set)
+        unknown = set()
+        for messageid in messageids:
+            if messageid in self.routes:
+                self.routes.move_to_end(messageid)
+                routed[self.routes[messageid]].add(messageid)
+            else:
+                unknown.add(messageid)
+        for db_name in databases:
+            if not unknown:
+                break
+            found = NimbaSmsWebhook._probe_database_for_sids(db_name, unknown)
+            unknown -= found
+            routed[db_name] |= found
+            for messageid in found:
+                self.routes[messageid] = db_name
+        while len(self.routes) > ROUTE_CACHE_SIZE:
+            self.routes.popitem(last=False)
+        return routed
+
+    def _apply(self, db_name, reports):
+        """Match and apply the reports of one database in one transaction."""
+        from odoo.modules.registry import Registry
+
+        registry = Registry(db_name)
+        for attempt in range(1, CHUNK_ATTEMPTS + 1):
+            try:
+                with registry.cursor() as cr:
+                    env = api.Environment(cr, SUPERUSER_ID, {})
+                    SmsSms = env['sms.sms'].sudo()
+                    matches = SmsSms._nimba_match_delivery_reports(
+                        [(report['messageid'], report['contact']) for report in reports])
+                    matched = [
+                        (sms, report['status'], report['contact'], report['error'])
+                        for sms, report in zip(matches, reports) if sms
+                    ]
+                    if self.args.dry_run:
+                        cr.rollback()
+                        return len(matched), 0
+                    updated = SmsSms._nimba_apply_delivery_reports(matched, latency=False)
+                    return len(matched), len(updated)
+            except pg_errors.SerializationFailure:
+                # Concurrent webhook updating the same SMS: retry the chunk
+                time.sleep(0.1 * attempt)
+        raise RuntimeError(f"Could not apply {len(reports)} Nimba SMS delivery reports to '{db_name}'")
+
+    def run(self, stream):
+        databases = self._get_databases()
+        start = time.monotonic()
+        reports = self._iter_reports(stream)
+        while True:
+            chunk = list(itertools.islice(reports, self.args.chunk_size))
+            if not chunk:
+                break
+            self.counters['read'] += len(chunk)
+
+            valid = []
+            for report in chunk:
+                messageid = str(report.get('messageid') or '').strip()
+                status = str(report.get('status') or '').strip().lower()
+                if not messageid or status not in NIMBA_REPORT_STATUSES:
+                    self.counters['invalid'] += 1
+                    continue
+                valid.append({
+                    'messageid': messageid,
+                    'contact': str(report.get('contact') or '').strip(),
+                    'status': status,
+                    'error': report.get('error') or None,
+                })
+
+            routed = self._route(databases, {report['messageid'] for report in valid})
+            database_of = {messageid: db_name for db_name, messageids in routed.items() for messageid in messageids}
+            reports_per_db = defaultdict(list)
+            for report in valid:
+                db_name = database_of.get(report['messageid'])
+                if db_name:
+                    reports_per_db[db_name].append(report)
+                else:
+                    self.counters['unrouted'] += 1
+
+            for db_name, db_reports in reports_per_db.items():
+                matched, applied = self._apply(db_name, db_reports)
+                self.counters['unmatched'] += len(db_reports) - matched
+                if not self.args.dry_run:
+                    self.counters['duplicate'] += matched - applied
+                    self.counters['applied'] += applied
+
+            elapsed = time.monotonic() - start
+            _logger.info(
+                f"Nimba SMS reports: {self.counters['read']} read, {self.counters['applied']} applied "
+                f"in {elapsed:.1f}s ({self.counters['read'] / max(elapsed, 0.001):.0f}/s)"
+            )
+        return dict(self.counters, seconds=round(time.monotonic() - start, 1))
@@ -0,0 +1,267 @@
+# -*- coding: utf-8 -*-
+
+import argparse
+import asyncio
+import logging
+import signal
+import sys
+import time
+from datetime import timedelta
+from pathlib import Path
+
+from odoo import SUPERUSER_ID, api, fields
+from odoo.cli import Command
+from odoo.tools import config
+from odoo.addons.nimbasms.tools.sms_api import NIMBA_DRAIN_STATES, SmsApiNimba, SmsApiNimbaResults
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+_logger = logging.getLogger(__name__)
+
+DEFAULT_API_URL = 'https://api.nimbasms.com/v1'
+
+
+class NimbaSender(Command):
+    """Send queued Nimba SMS from a standalone asyncio process"""
+
+    name = 'nimba_sender'
+
+    def run(self, cmdargs):
+        parser = argparse.ArgumentParser(
+            prog=f'{Path(sys.argv[0]).name} {self.name}',
+            description=(
+                "Claim queued Nimba SMS of a database and send them with many "
+                "requests in flight. Several senders (and the regular SMS cron) "
+                "can run side by side: batches are claimed with SKIP LOCKED."
+            ),
+        )
+        parser.add_argument('-c', '--config', dest='config', help="Odoo configuration file")
+        parser.add_argument('-d', '--database', dest='database', required=True, help="Database to send from")
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help="Queued SMS claimed per transaction (default: %(default)s)")
+        parser.add_argument('--concurrency', type=int, default=20,
+                            help="Maximum API requests in flight (default: %(default)s)")
+        parser.add_argument('--poll-interval', type=float, default=5.0,
+                            help="Seconds to wait when the queue is empty (default: %(default)s)")
+        parser.add_argument('--timeout', type=float, default=30.0,
+                            help="Timeout of one API request in seconds (default: %(default)s)")
+        parser.add_argument('--api-url', default=DEFAULT_API_URL,
+                            help="Nimba SMS API base URL, e.g. a local stand-in for tests (default: %(default)s)")
+        parser.add_argument('--once', action='store_true', help="Exit once the queue is empty")
+        args = parser.parse_args(cmdargs)
+
+        if aiohttp is None:
+            sys.exit("The nimba_sender command requires aiohttp: pip install aiohttp")
+
+        odoo_args = ['-d', args.database]
+        if args.config:
+            odoo_args += ['-c', args.config]
+        config.parse_config(odoo_args, setup_logging=True)
+
+        sender = NimbaAsyncSender(args)
+        asyncio.run(sender.serve())
+
+
+class NimbaAsyncSender:
+    """
+    Claim queued Nimba SMS batches and send them over an async HTTP client.
+
+    Each claimed batch is processed in one transaction: the SMS are locked
+    with ``FOR UPDATE SKIP LOCKED``, their messages go through the same
+    preparation and filters as ``SmsApiNimba._send_sms_batch``, requests are
+    sent concurrently, and the results are written back through the regular
+    ``sms.sms._send`` post-processing (``SmsApiNimbaResults``).
+    """
+
+    def __init__(self, args):
+        self.args = args
+        self.stopping = False
+
+    def _stop(self):
+        _logger.info("Nimba SMS sender stopping after the current batch")
+        self.stopping = True
+
+    async def serve(self):
+        from odoo.modules.registry import Registry
+
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, self._stop)
+
+        registry = Registry(self.args.database)
+        semaphore = asyncio.Semaphore(self.args.concurrency)
+        connector = aiohttp.TCPConnector(limit=self.args.concurrency)
+        timeout = aiohttp.ClientTimeout(total=self.args.timeout)
+        _logger.info(
+            f"Nimba SMS sender started on '{self.args.database}' "
+            f"(batch size {self.args.batch_size}, concurrency {self.args.concurrency})"
+        )
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+            while not self.stopping:
+                start = time.monotonic()
+                try:
+                    count = await self.process_batch(registry, session, semaphore)
+                except Exception:
+                    _logger.exception("Nimba SMS sender failed to process a batch")
+                    count = 0
+                if count:
+                    _logger.info(f"Nimba SMS sender processed {count} SMS in {time.monotonic() - start:.2f}s")
+                    continue
+                if self.args.once:
+                    break
+                await asyncio.sleep(self.args.poll_interval)
+
+    def _claim(self, env):
+        """
+        Lock the next due Nimba SMS of the queue, skipping those claimed by
+        other senders or cron workers.
+
+        SMS of companies that no longer send through Nimba SMS, or whose
+        circuit breaker is open and still cooling down, are not claimed: they
+        would be skipped and claimed again on every poll, stalling the queue.
+        """
+        now = fields.Datetime.now()
+        cooldown = env['sms.nimba.circuit']._get_circuit_params()['cooldown']
+        env.cr.execute("""
+            SELECT sms.id
+              FROM sms_sms sms
+              JOIN res_company company
+                ON company.id = sms.sms_nimba_company_id AND company.sms_provider = 'nimba'
+         LEFT JOIN sms_nimba_circuit circuit
+                ON circuit.company_id = company.id
+             WHERE sms.state = 'outgoing'
+               AND sms.to_delete IS NOT TRUE
+               AND (sms.sms_nimba_send_after IS NULL OR sms.sms_nimba_send_after <= %(now)s)
+               AND (circuit.state IS NULL OR circuit.state = 'closed'
+                    OR circuit.opened_at IS NULL OR circuit.opened_at <= %(cooled_down)s)
+          ORDER BY sms.id
+             LIMIT %(limit)s
+               FOR UPDATE OF sms SKIP LOCKED
+        """, {
+            'now': now,
+            'cooled_down': now - timedelta(seconds=cooldown),
+            'limit': self.args.batch_size,
+        })
+        return env['sms.sms'].browse([row[0] for row in env.cr.fetchall()])
+
+    async def process_batch(self, registry, session, semaphore):
+        """Claim, send and write back one batch; return the number of SMS processed."""
+        processed = 0
+        with registry.cursor() as cr:
+            env = api.Environment(cr, SUPERUSER_ID, {})
+            sms_records = self._claim(env)
+
+            for sms_api, company_sms in sms_records._split_by_api():
+                if not isinstance(sms_api, SmsApiNimba):
+                    continue  # provider changed since the SMS was queued: left to the cron
+                if not sms_api._nimba_circuit_allows():
+                    _logger.info(f"Nimba SMS circuit breaker open, keeping {len(company_sms)} SMS queued")
+                    continue
+                results = await self.send_company_batch(sms_api, company_sms, session, semaphore)
+                results_api = SmsApiNimbaResults(env, results)
+                results_api._set_company(sms_api.company)
+                company_sms.with_context(sms_api=results_api)._send(
+                    unlink_failed=False, unlink_sent=True, raise_exception=False,
+                )
+                processed += len(company_sms)
+        return processed
+
+    async def send_company_batch(self, sms_api, company_sms, session, semaphore):
+        """
+        Send the SMS of one company and return their results, in the shape
+        returned by ``SmsApiNimba._send_sms_batch``.
+        """
+        env = sms_api.env
+        messages = [{
+            'content': body,
+            'numbers': [{'number': sms.number, 'uuid': sms.uuid} for sms in body_sms],
+        } for body, body_sms in company_sms.grouped('body').items()]
+
+        configuration_errors = sms_api._check_nimba_configuration(messages, require_sdk=False)
+        if configuration_errors is not None:
+            return configuration_errors
+
+        prepared, results = sms_api._prepare_nimba_messages(messages)
+        prepared, blocked = sms_api._filter_blocked_recipients(prepared)
+        results += blocked
+
+        company_sudo = sms_api.company.sudo()
+        accounts = sms_api._get_nimba_accounts()
+        pending = prepared
+        while pending:
+            requests = []
+            for body, phone_numbers, uuid_map in pending:
+                if accounts is None:
+                    account = env['sms.nimba.account']
+                    credentials = (company_sudo.sms_nimba_service_id, company_sudo.sms_nimba_secret_token,
+                                   company_sudo.sms_nimba_sender_name)
+                else:
+                    account = env['sms.nimba.account']._select_account(
+                        accounts, company_sudo.sms_nimba_pool_strategy, count=len(phone_numbers))
+                    credentials = (account.service_id, account.secret_token, account.sender_name)
+                requests.append((body, phone_numbers, uuid_map, account, credentials))
+
+            outcomes = await asyncio.gather(*(
+                self.post_message(sms_api, session, semaphore, credentials, body, phone_numbers)
+                for body, phone_numbers, _uuid_map, _account, credentials in requests
+            ))
+
+            retry = []
+            for (body, phone_numbers, uuid_map, account, _credentials), outcome in zip(requests, outcomes):
+                status_code, data, text, latency, error = outcome
+                failed = error is not None or status_code >= 500
+                sms_api._record_nimba_call(latency, failed=failed, error=error or (text if failed else None))
+                if error is not None:
+                    results += sms_api._get_message_failed_results(phone_numbers, uuid_map, 'server_error', error)
+                    continue
+                message_results = sms_api._get_nimba_results(
+                    status_code, data, text, phone_numbers, uuid_map, account=account or None)
+                if accounts and message_results[0]['state'] in NIMBA_DRAIN_STATES:
+                    if account in accounts:
+                        account._drain(message_results[0]['failure_reason'])
+                        accounts -= account
+                    if accounts:
+                        retry.append((body, phone_numbers, uuid_map))
+                        continue
+                results += message_results
+            if sms_api._flush_nimba_calls() and retry:
+                unsent = sum(len(phone_numbers) for _body, phone_numbers, _uuid_map in retry)
+                _logger.warning(f"Nimba SMS circuit breaker tripped, keeping {unsent} SMS queued")
+                break
+            pending = retry
+        return results
+
+    async def post_message(self, sms_api, session, semaphore, credentials, body, phone_numbers):
+        """
+        Send one message to its recipients.
+
+        :return: tuple (status_code, data, text, latency, error) where error
+                 is set when no HTTP response was received
+        """
+        service_id, secret_token, sender_name = credentials
+        async with semaphore:
+            start = time.monotonic()
+            try:
+                if sms_api.company.sudo().sms_nimba_transport == 'shadow':
+                    client = sms_api._get_nimba_client(service_id, secret_token)
+                    response = await asyncio.get_running_loop().run_in_executor(
+                        None, client.messages.create, phone_numbers, sender_name, body)
+                    return response.status_code, response.data, response.text, time.monotonic() - start, None
+
+                async with session.post(
+                    f"{self.args.api_url.rstrip('/')}/messages",
+                    json={'to': phone_numbers, 'sender_name': sender_name, 'message': body},
+                    auth=aiohttp.BasicAuth(service_id, secret_token),
+                ) as response:
+                    text = await response.text()
+                    try:
+                        data = await response.json(content_type=None)
+                    except ValueError:
+                        data = None
+                    return response.status, data, text, time.monotonic() - start, None
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                _logger.error(f"Nimba SMS request failed: {e!r}")
+                return None, None, None, time.monotonic() - start, str(e) or e.__class__.__name__
@@ -4,9 +4,14 @@ import json
 import logging
 import hmac
 import hashlib
+import threading
+from collections import OrderedDict
+
+from psycopg2 import errors as pg_errors
 
 from odoo import http
 from odoo.http import request
+from odoo.addons.nimbasms.tools import nimba_sink
 
 _logger = logging.getLogger(__name__)
 
@@ -18,6 +23,13 @@ NIMBA_TO_SMS_STATE = {
 }
 
 
+# Multi-tenant webhook bookkeeping (per worker)
+_tenant_lock = threading.Lock()
+# messageid -> database, so later reports of a batch skip the probing
+_sid_databases = OrderedDict()
+SID_DATABASE_CACHE_SIZE = 10000
+
+
 class NimbaSmsWebhook(http.Controller):
     """
     Webhook controller for receiving delivery status callbacks from Nimba SMS provider.
@@ -26,56 +38,22 @@ class NimbaSmsWebhook(http.Controller):
     to update the delivery status of sent messages.
     """
 
-    @staticmethod
-    def _normalize_phone(number):
-        """Strip '+' prefix and spaces from a phone number for comparison."""
-        if not number:
-            return ''
-        return number.lstrip('+').replace(' ', '').replace('-', '')
-
     @staticmethod
     def _find_sms_by_nimba_callback(sms_model, messageid, contact):
         """
         Find the specific sms.sms record matching a Nimba callback.
 
         NimbaSMS returns a single messageid for an entire batch of recipients.
-        We use the contact phone number to identify the correct record.
+        The messageid is resolved to its ``sms.nimba.batch`` and the contact
+        phone number identifies the correct record
+        (see ``sms.sms._nimba_match_delivery_reports``).
 
         :param sms_model: sms.sms model (sudo'd)
         :param messageid: Nimba message ID
         :param contact: recipient phone number from the webhook
         :return: single sms.sms recordset (may be empty)
         """
-        all_sms = sms_model.search([('sms_nimba_sid', '=', messageid)])
-        if not all_sms:
-            return sms_model  # empty recordset
-
-        contact_normalized = NimbaSmsWebhook._normalize_phone(contact)
-        if contact_normalized:
-            target = all_sms.filtered(
-                lambda s: NimbaSmsWebhook._normalize_phone(s.number) == contact_normalized
-            )[:1]
-            if target:
-                return target
-
-        # Fallback: return the first undelivered SMS, or just the first one
-        pending = all_sms.filtered(lambda s: s.state not in ('sent', 'error'))[:1]
-        return pending or all_sms[:1]
-
-    @staticmethod
-    def _update_sms_from_nimba_status(sms_record, status, error_message=None):
-        """
-        Update an sms.sms record based on Nimba webhook status.
-
-        :param sms_record: sms.sms recordset (single record)
-        :param status: Nimba status string ('received' or 'failed')
-        :param error_message: optional error message for failed status
-        """
-        odoo_state = NIMBA_TO_SMS_STATE.get(status, 'error')
-        update_vals = {'state': odoo_state}
-        if odoo_state == 'error':
-            update_vals['failure_type'] = 'sms_delivery'
-        sms_record.write(update_vals)
+        return sms_model._nimba_match_delivery_reports([(messageid, contact)])[0]
 
     @http.route(['/sms/webhook/nimba', '/sms/webhook/nimba/<string:db_name>'], type='http', auth='public', methods=['POST', 'GET'], csrf=False)
     def nimba_sms_delivery_callback(self, db_name=None, **kwargs):
@@ -176,11 +154,19 @@ class NimbaSmsWebhook(http.Controller):
         contact = data.get('contact', '')
         status = data.get('status', '').lower()
 
-        # Get list of all databases
+        # Get list of all databases, the one known for this batch first
         db_list = odoo.service.db.list_dbs(True)
+        known_db = _sid_databases.get(messageid)
+        if known_db in db_list:
+            db_list = [known_db] + [db for db in db_list if db != known_db]
 
         found = False
         for db_name in db_list:
+            # Cheap probe with a pooled cursor: only load the registry of
+            # the database actually holding the batch (loaded registries are
+            # bounded by the server's registry LRU, see ``registry_lru_size``)
+            if db_name != known_db and not self._probe_database_for_sid(db_name, messageid):
+                continue
             try:
                 db_registry = Registry(db_name)
                 with db_registry.cursor() as cr:
@@ -193,27 +179,19 @@ class NimbaSmsWebhook(http.Controller):
                     if not sms:
                         continue
 
-                    # Try to update via tracker if available (linked via uuid)
-                    SmsTracker = env['sms.tracker'].sudo()
-                    tracker = SmsTracker.search([
-                        ('sms_uuid', '=', sms.uuid),
-                    ], limit=1) if sms.uuid else SmsTracker
-
-                    if tracker:
-                        if status == 'failed':
-                            error_message = data.get('error', 'Delivery failed')
-                            tracker._action_update_from_nimba_error(error_message)
-                        elif status in NIMBA_TO_SMS_STATE:
-                            odoo_state = NIMBA_TO_SMS_STATE[status]
-                            tracker._action_update_from_sms_state(odoo_state)
-                        cr.commit()
-                        _logger.info(f"Updated SMS tracker {tracker.id} for sms.sms {sms.id} in '{db_name}' (messageid: {messageid}) to {NIMBA_TO_SMS_STATE.get(status, 'error')} for contact {contact}")
-                    else:
-                        # No tracker, update sms.sms directly
-                        self._update_sms_from_nimba_status(sms, status)
-                        cr.commit()
+                    with self._get_profiled_company(env, sms)._nimba_profile('webhook', target='webhook'):
+                        updated = SmsSms._nimba_apply_delivery_reports([(sms, status, contact, data.get('error'))])
+                    cr.commit()
+                    if updated:
                         _logger.info(f"Updated SMS {sms.id} in '{db_name}' (messageid: {messageid}) to {NIMBA_TO_SMS_STATE.get(status, 'error')} for contact {contact}")
+                    else:
+                        _logger.info(f"Ignored repeated or unknown report for SMS {sms.id} in '{db_name}' (messageid: {messageid})")
 
+                    with _tenant_lock:
+                        _sid_databases[messageid] = db_name
+                        _sid_databases.move_to_end(messageid)
+                        while len(_sid_databases) > SID_DATABASE_CACHE_SIZE:
+                            _sid_databases.popitem(last=False)
                     found = True
                     break
 
@@ -235,6 +213,40 @@ class NimbaSmsWebhook(http.Controller):
             status=200
         )
 
+    @staticmethod
+    def _probe_database_for_sid(db_name, messageid):
+        """
+        Check whether a database holds SMS of a Nimba batch, without loading
+        its registry.
+
+        :param db_name: database to probe
+        :param messageid: Nimba message ID
+        :return: True if the database has a batch with this messageid
+        """
+        return bool(NimbaSmsWebhook._probe_database_for_sids(db_name, [messageid]))
+
+    @staticmethod
+    def _probe_database_for_sids(db_name, messageids):
+        """
+        Set-based version of ``_probe_database_for_sid``.
+
+        :param db_name: database to probe
+        :param messageids: list of Nimba message IDs
+        :return: set of the messageids having a batch in the database
+        """
+        from odoo.sql_db import db_connect
+
+        try:
+            with db_connect(db_name).cursor() as cr:
+                cr.execute("SELECT messageid FROM sms_nimba_batch WHERE messageid = ANY(%s)", [list(messageids)])
+                return {row[0] for row in cr.fetchall()}
+        except (pg_errors.UndefinedTable, pg_errors.UndefinedColumn):
+            # Database without the Nimba SMS module
+            return set()
+        except Exception as e:
+            _logger.warning(f"Error probing database '{db_name}' for Nimba webhook: {str(e)}")
+            return set()
+
     def _validate_webhook_signature(self, request):
         """
         Validate webhook signature for security.
@@ -275,6 +287,48 @@ class NimbaSmsWebhook(http.Controller):
         # Compare signatures
         return hmac.compare_digest(signature_header, expected_signature)
 
+    def _get_profiled_company(self, env, sms):
+        """
+        Return the company the delivery report of ``sms`` is profiled for:
+        the company the SMS was sent for, forced to profile the report when
+        the request carries a valid ``X-Nimba-Profile`` header (see
+        ``_is_profiling_requested``), otherwise profiling it only when the
+        company has profiled webhook runs left.
+
+        :param env: environment of the database holding the SMS
+        :param sms: sms.sms record matching the report
+        :return: res.company record
+        """
+        company = sms._get_nimba_company()
+        if self._is_profiling_requested(env):
+            company = company.with_context(nimba_profile=True)
+        return company
+
+    def _is_profiling_requested(self, env):
+        """
+        Whether the request asks to profile its delivery report.
+
+        The ``X-Nimba-Profile`` header must hold the HMAC-SHA256 of
+        ``'profile:'`` followed by the request body, keyed with
+        ``sms.nimba_webhook_secret``, so only administrators knowing the
+        secret can trigger it. Never set when no secret is configured.
+
+        :param env: environment of the database holding the SMS
+        :return: True if the header is present and valid
+        """
+        header = request.httprequest.headers.get('X-Nimba-Profile', '')
+        if not header:
+            return False
+        webhook_secret = env['ir.config_parameter'].sudo().get_param('sms.nimba_webhook_secret', default='')
+        if not webhook_secret:
+            return False
+        expected = hmac.new(
+            webhook_secret.encode('utf-8'),
+            b'profile:' + request.httprequest.data,
+            hashlib.sha256
+        ).hexdigest()
+        return hmac.compare_digest(header, expected)
+
     def _process_delivery_status(self, data):
         """
         Process the delivery status update from Nimba SMS webhook.
@@ -302,8 +356,12 @@ class NimbaSmsWebhook(http.Controller):
         sms = self._find_sms_by_nimba_callback(SmsSms, messageid, contact)
 
         if sms:
-            self._update_sms_from_nimba_status(sms, status)
-            _logger.info(f"Updated SMS {sms.id} (messageid: {messageid}) to {NIMBA_TO_SMS_STATE.get(status, 'error')} for contact {contact}")
+            with self._get_profiled_company(request.env, sms)._nimba_profile('webhook', target='webhook'):
+                updated = SmsSms._nimba_apply_delivery_reports([(sms, status, contact, data.get('error'))])
+            if updated:
+                _logger.info(f"Updated SMS {sms.id} (messageid: {messageid}) to {NIMBA_TO_SMS_STATE.get(status, 'error')} for contact {contact}")
+            else:
+                _logger.info(f"Ignored repeated or unknown report for SMS {sms.id} (messageid: {messageid})")
         else:
             _logger.warning(f"Could not find SMS with sms_nimba_sid={messageid} for contact {contact}")
 
@@ -329,6 +387,86 @@ class NimbaSmsWebhook(http.Controller):
 
         return status_mapping.get(provider_status.lower(), 'error')
 
+    @http.route('/sms/nimba/sink', type='http', auth='user', methods=['GET'])
+    def nimba_sms_sink_stats(self, limit=100):
+        """
+        Report the shadow transport sink counters of the database (all
+        workers) and the most recent requests recorded by this worker.
+
+        :param limit: number of most recent requests to return
+        :return: JSON response with counters and recent requests
+        """
+        if not request.env.user.has_group('base.group_system'):
+            return request.make_response(
+                json.dumps({'status': 'error', 'message': 'Access denied'}),
+                headers={'Content-Type': 'application/json'},
+                status=403
+            )
+        counters, records = nimba_sink.get_stats(request.env.cr.dbname)
+        return request.make_response(
+            json.dumps({
+                'status': 'ok',
+                'counters': counters,
+                'requests': records[-int(limit):] if int(limit) > 0 else [],
+            }),
+            headers={'Content-Type': 'application/json'},
+            status=200
+        )
+
+    @http.route('/sms/nimba/sink/reset', type='http', auth='user', methods=['POST'])
+    def nimba_sms_sink_reset(self, **kwargs):
+        """
+        Clear the shadow transport sink counters of the database and the
+        requests recorded by this worker.
+
+        :return: JSON response
+        """
+        if not request.env.user.has_group('base.group_system'):
+            return request.make_response(
+                json.dumps({'status': 'error', 'message': 'Access denied'}),
+                headers={'Content-Type': 'application/json'},
+                status=403
+            )
+        nimba_sink.reset(request.env.cr.dbname)
+        return request.make_response(
+            json.dumps({'status': 'ok'}),
+            headers={'Content-Type': 'application/json'},
+            status=200
+        )
+
+    @http.route('/sms/nimba/latency', type='http', auth='user', methods=['GET'])
+    def nimba_sms_latency_report(self, hours=24, company_id=None):
+        """
+        Report the send-to-delivery latency percentiles and failure rates of
+        a company, overall and per hour.
+
+        :param hours: number of hours to report, up to 720
+        :param company_id: company to report on; defaults to the current company
+        :return: JSON response
+        """
+        if not request.env.user.has_group('base.group_system'):
+            return request.make_response(
+                json.dumps({'status': 'error', 'message': 'Access denied'}),
+                headers={'Content-Type': 'application/json'},
+                status=403
+            )
+        company = request.env.company
+        if company_id:
+            company = request.env['res.company'].browse(int(company_id))
+            if company not in request.env.user.company_ids:
+                return request.make_response(
+                    json.dumps({'status': 'error', 'message': 'Unknown company'}),
+                    headers={'Content-Type': 'application/json'},
+                    status=404
+                )
+        hours = min(max(int(hours), 1), 720)
+        report = request.env['sms.nimba.latency'].sudo()._get_report(company, hours=hours)
+        return request.make_response(
+            json.dumps(dict(report, status='ok', company_id=company.id)),
+            headers={'Content-Type': 'application/json'},
+            status=200
+        )
+
     @http.route('/sms/webhook/test', type='http', auth='user', methods=['GET'])
     def test_webhook_endpoint(self):
         """
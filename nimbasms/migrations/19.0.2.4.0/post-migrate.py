@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""
+Move the Nimba messageids repeated on SMS and trackers to
+``sms.nimba.batch`` and link the rows through ``sms_nimba_batch_id``, then
+drop the old ``sms_nimba_sid`` columns.
+
+A batch takes the company of its SMS; batches only known from trackers
+keep an empty company, and their deliveries are accounted to the company
+of their SMS. The send time of migrated batches is unknown and left empty,
+so their deliveries are not counted in the latency histogram.
+"""
+
+import logging
+
+from odoo.tools.sql import column_exists
+
+_logger = logging.getLogger(__name__)
+
+# (table, foreign key column, company column or None)
+SID_TABLES = [
+    ('sms_sms', 'sms_nimba_batch_id', 'sms_nimba_company_id'),
+    ('sms_tracker', 'sms_nimba_batch_id', None),
+]
+
+
+def migrate(cr, version):
+    tables = [table for table in SID_TABLES if column_exists(cr, table[0], 'sms_nimba_sid')]
+    if not tables:
+        return
+
+    sources = " UNION ALL ".join(
+        f"SELECT sms_nimba_sid AS messageid, {company or 'NULL::int'} AS company_id "
+        f"FROM {table} WHERE sms_nimba_sid IS NOT NULL"
+        for table, _fk, company in tables
+    )
+    cr.execute(f"""
+        INSERT INTO sms_nimba_batch (messageid, company_id, send_date, recipient_count,
+                                     create_uid, create_date, write_uid, write_date)
+             SELECT messageid,
+                    MIN(company_id),
+                    NULL, 0,
+                    1, now() at time zone 'UTC', 1, now() at time zone 'UTC'
+               FROM ({sources}) AS sids
+           GROUP BY messageid
+        ON CONFLICT (messageid) DO NOTHING
+    """)
+    _logger.info(f"Nimba SMS: created {cr.rowcount} batches from existing messageids")
+
+    for table, fk, _company in tables:
+        cr.execute(f"""
+            UPDATE {table} AS t
+               SET {fk} = batch.id
+              FROM sms_nimba_batch AS batch
+             WHERE t.sms_nimba_sid = batch.messageid
+               AND t.{fk} IS NULL
+        """)
+
+    # Recipients of a batch: its SMS still around
+    cr.execute("""
+        UPDATE sms_nimba_batch AS batch
+           SET recipient_count = sms.total
+          FROM (SELECT sms_nimba_batch_id, COUNT(*) AS total FROM sms_sms
+                 WHERE sms_nimba_batch_id IS NOT NULL GROUP BY sms_nimba_batch_id) AS sms
+         WHERE sms.sms_nimba_batch_id = batch.id
+    """)
+
+    for table, _fk, _company in tables:
+        cr.execute(f"ALTER TABLE {table} DROP COLUMN sms_nimba_sid")
@@ -1,6 +1,16 @@
 # -*- coding: utf-8 -*-
 
+from . import phone_blacklist
 from . import res_company
+from . import sms_nimba_account
+from . import sms_nimba_account_usage
+from . import sms_nimba_batch
+from . import sms_nimba_circuit
+from . import sms_nimba_invalid_number
+from . import sms_nimba_latency
+from . import sms_nimba_optout
+from . import sms_nimba_sink_counter
+from . import sms_nimba_stats
 from . import sms_sms
 from . import sms_tracker
 from . import res_config_settings
@@ -2,12 +2,7 @@
 
 from odoo import api, fields, models, _
 from odoo.exceptions import UserError
-
-try:
-    from nimbasms import Client, NimbaSMSException
-except ImportError:
-    Client = None
-    NimbaSMSException = Exception
+from odoo.addons.nimbasms.tools import nimba_sdk
 
 
 class SmsNimbaAccountWizard(models.TransientModel):
@@ -94,6 +89,7 @@ class SmsNimbaAccountWizard(models.TransientModel):
         self.ensure_one()
 
         # Check if SDK is available
+        Client, NimbaSMSException = nimba_sdk.get_sdk()
         if Client is None:
             raise UserError(_('Nimba SMS SDK not installed. Please run: pip install nimbasms'))
 
@@ -0,0 +1,10 @@
+# -*- coding: utf-8 -*-
+
+from odoo import models
+
+
+class PhoneBlacklist(models.Model):
+    _inherit = 'phone.blacklist'
+
+    # Numbers blacklisted since the Nimba SMS blocklist filter was built
+    _write_date_idx = models.Index('(write_date) WHERE active')
@@ -1,8 +1,15 @@
 # -*- coding: utf-8 -*-
 
+import json
+import logging
+from contextlib import contextmanager
+
 from odoo import fields, models, _
+from odoo.addons.nimbasms.tools import nimba_profiler
 from odoo.addons.nimbasms.tools.sms_api import SmsApiNimba
 
+_logger = logging.getLogger(__name__)
+
 
 class ResCompany(models.Model):
     _inherit = 'res.company'
@@ -17,6 +24,40 @@ class ResCompany(models.Model):
         default='iap',
     )
 
+    # Nimba SMS transport (shadow mode sends to a local sink for load testing)
+    sms_nimba_transport = fields.Selection(
+        string='Nimba SMS Transport',
+        selection=[
+            ('live', 'Live'),
+            ('shadow', 'Shadow (local sink, nothing is sent)'),
+        ],
+        default='live',
+        required=True,
+    )
+    sms_nimba_sink_latency = fields.Integer(
+        string='Nimba SMS Sink Latency (ms)',
+        default=200,
+        help='Simulated API response time'
+    )
+    sms_nimba_sink_error_rate = fields.Float(
+        string='Nimba SMS Sink Error Rate',
+        default=0.0,
+        help='Share (0-1) of requests failing with a simulated server error'
+    )
+    sms_nimba_sink_callbacks = fields.Boolean(
+        string='Nimba SMS Sink Delivery Callbacks',
+        help='Post synthetic delivery reports to the Nimba SMS webhook of this database'
+    )
+    sms_nimba_sink_callback_delay = fields.Float(
+        string='Nimba SMS Sink Callback Delay (s)',
+        default=2.0,
+    )
+    sms_nimba_sink_failure_rate = fields.Float(
+        string='Nimba SMS Sink Delivery Failure Rate',
+        default=0.0,
+        help="Share (0-1) of synthetic delivery reports with the 'failed' status"
+    )
+
     # Nimba SMS configuration fields
     sms_nimba_service_id = fields.Char(
         string='Nimba SMS Service ID',
@@ -34,6 +75,68 @@ class ResCompany(models.Model):
         help='Your approved sender name or short code'
     )
 
+    # Nimba SMS account pool (takes precedence over the single account above)
+    sms_nimba_account_ids = fields.One2many(
+        'sms.nimba.account',
+        'company_id',
+        string='Nimba SMS Account Pool',
+    )
+    sms_nimba_pool_strategy = fields.Selection(
+        string='Nimba SMS Pool Strategy',
+        selection=[
+            ('weighted', 'Weighted Round-Robin'),
+            ('least_loaded', 'Least Loaded'),
+        ],
+        default='weighted',
+        help='How batches are spread across the accounts of the pool'
+    )
+
+    # Nimba SMS campaign pacing
+    sms_nimba_pacing_mode = fields.Selection(
+        string='Nimba SMS Pacing',
+        selection=[
+            ('none', 'Send as fast as possible'),
+            ('rate', 'Messages per minute'),
+            ('window', 'Spread over a time window'),
+        ],
+        default='none',
+        required=True,
+        help='Assign queued SMS a send slot so that large campaigns do not burst'
+    )
+    sms_nimba_pacing_rate = fields.Integer(
+        string='Nimba SMS Messages per Minute',
+        default=600,
+    )
+    sms_nimba_pacing_window = fields.Integer(
+        string='Nimba SMS Pacing Window (minutes)',
+        default=60,
+        help='Each batch of queued SMS is spread evenly over this many minutes'
+    )
+    sms_nimba_quiet_hours = fields.Boolean(
+        string='Nimba SMS Quiet Hours',
+        help='Do not schedule paced SMS during these hours (company timezone)'
+    )
+    sms_nimba_quiet_hour_from = fields.Float(string='Nimba SMS Quiet Hours From', default=21.0)
+    sms_nimba_quiet_hour_to = fields.Float(string='Nimba SMS Quiet Hours To', default=7.0)
+
+    # Nimba SMS profiling (opt-in, for a limited number of runs)
+    sms_nimba_profile_runs = fields.Integer(
+        string='Nimba SMS Profiled Runs',
+        default=0,
+        copy=False,
+        help='Number of upcoming runs to profile; decreases after each profiled run'
+    )
+    sms_nimba_profile_target = fields.Selection(
+        string='Nimba SMS Profiling Target',
+        selection=[
+            ('queue', 'SMS queue'),
+            ('webhook', 'Delivery webhook'),
+            ('both', 'Both'),
+        ],
+        default='queue',
+        required=True,
+    )
+
     def _get_sms_api_class(self):
         """Return the SMS API class based on provider."""
         self.ensure_one()
@@ -41,6 +144,21 @@ class ResCompany(models.Model):
             return SmsApiNimba
         return super()._get_sms_api_class()
 
+    def _get_nimba_account_pool(self):
+        """Return the healthy accounts of the company's Nimba SMS pool."""
+        self.ensure_one()
+        return self.env['sms.nimba.account'].sudo().search([
+            ('company_id', '=', self.id),
+            ('health_state', '=', 'healthy'),
+        ])
+
+    def _has_nimba_account_pool(self):
+        """Whether the company sends through an account pool rather than its single account."""
+        self.ensure_one()
+        return bool(self.env['sms.nimba.account'].sudo().search_count([
+            ('company_id', '=', self.id),
+        ], limit=1))
+
     def _action_open_nimba_sms_manage(self):
         """
         Open the Nimba SMS configuration wizard in a modal.
@@ -70,3 +188,100 @@ class ResCompany(models.Model):
             'target': 'new',  # Opens in modal dialog
             'context': dict(self.env.context),
         }
+
+    def _action_open_nimba_sms_account_pool(self):
+        """Open the list of Nimba SMS accounts pooled for this company."""
+        self.ensure_one()
+        return {
+            'type': 'ir.actions.act_window',
+            'name': _('Nimba SMS Account Pool'),
+            'res_model': 'sms.nimba.account',
+            'view_mode': 'list,form',
+            'domain': [('company_id', '=', self.id)],
+            'context': dict(self.env.context, default_company_id=self.id),
+        }
+
+    # ------------------------------------------------------------------
+    # PROFILING
+    # ------------------------------------------------------------------
+
+    def _nimba_profile_claim(self, target):
+        """
+        Consume one profiled run of the company for ``target``.
+
+        The counter is decremented in its own transaction, so concurrent
+        workers never profile more runs than requested.
+
+        :return: True if a run was claimed
+        """
+        self.ensure_one()
+        company_sudo = self.sudo()
+        if company_sudo.sms_nimba_profile_runs <= 0 or company_sudo.sms_nimba_profile_target not in (target, 'both'):
+            return False
+        with self.env.registry.cursor() as cr:
+            cr.execute("""
+                UPDATE res_company
+                   SET sms_nimba_profile_runs = sms_nimba_profile_runs - 1
+                 WHERE id = %s AND sms_nimba_profile_runs > 0 AND sms_nimba_profile_target IN %s
+            """, [self.id, (target, 'both')])
+            claimed = bool(cr.rowcount)
+        self.invalidate_recordset(['sms_nimba_profile_runs'])
+        return claimed
+
+    @contextmanager
+    def _nimba_profile(self, name, target='queue'):
+        """
+        Profile the enclosed run when the company has profiled runs left for
+        ``target``, or when ``nimba_profile`` is set in the context, and
+        attach the report to the company.
+
+        :param name: name of the run, e.g. 'queue' or 'webhook'
+        :yield: the active NimbaProfile, or None when not profiling
+        """
+        if not self or not (self.env.context.get('nimba_profile') or self._nimba_profile_claim(target)):
+            yield None
+            return
+        profile = None
+        try:
+            with nimba_profiler.profiling(name) as profile:
+                yield profile
+        finally:
+            if profile is not None:
+                self._nimba_profile_store(profile.report())
+
+    def _nimba_profile_store(self, report):
+        """Save a profile report as a JSON attachment of the company, whatever happens to the run's transaction."""
+        self.ensure_one()
+        filename = f"nimba_profile_{report['name']}_{report['start'][:19].replace(':', '')}.json"
+        try:
+            with self.env.registry.cursor() as cr:
+                self.env(cr=cr, su=True)['ir.attachment'].create({
+                    'name': filename,
+                    'raw': json.dumps(report, indent=1).encode(),
+                    'mimetype': 'application/json',
+                    'res_model': 'res.company',
+                    'res_id': self.id,
+                })
+        except Exception:
+            _logger.exception(f"Could not store Nimba SMS profile {filename}")
+            return
+        _logger.info(
+            f"Nimba SMS profile {filename}: {report['duration']:.3f}s, "
+            f"{report['sql']['count']} queries ({report['sql']['time']:.3f}s), "
+            f"network {report['network']['time']:.3f}s"
+        )
+
+    def _action_open_nimba_sms_profiles(self):
+        """Open the Nimba SMS profile reports attached to this company."""
+        self.ensure_one()
+        return {
+            'type': 'ir.actions.act_window',
+            'name': _('Nimba SMS Profiles'),
+            'res_model': 'ir.attachment',
+            'view_mode': 'list,form',
+            'domain': [
+                ('res_model', '=', 'res.company'),
+                ('res_id', '=', self.id),
+                ('name', '=like', 'nimba_profile_%'),
+            ],
+        }
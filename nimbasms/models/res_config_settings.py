@@ -1,6 +1,8 @@
 # -*- coding: utf-8 -*-
 
-from odoo import api, fields, models
+from odoo import api, fields, models, _
+
+from .sms_nimba_circuit import CIRCUIT_STATES
 
 
 class ResConfigSettings(models.TransientModel):
@@ -17,6 +19,37 @@ class ResConfigSettings(models.TransientModel):
         string='SMS Provider'
     )
 
+    sms_nimba_transport = fields.Selection(
+        related='company_id.sms_nimba_transport',
+        readonly=False,
+        string='Transport'
+    )
+    sms_nimba_sink_latency = fields.Integer(
+        related='company_id.sms_nimba_sink_latency',
+        readonly=False,
+        string='Simulated Latency (ms)'
+    )
+    sms_nimba_sink_error_rate = fields.Float(
+        related='company_id.sms_nimba_sink_error_rate',
+        readonly=False,
+        string='Simulated Error Rate'
+    )
+    sms_nimba_sink_callbacks = fields.Boolean(
+        related='company_id.sms_nimba_sink_callbacks',
+        readonly=False,
+        string='Synthetic Delivery Callbacks'
+    )
+    sms_nimba_sink_callback_delay = fields.Float(
+        related='company_id.sms_nimba_sink_callback_delay',
+        readonly=False,
+        string='Callback Delay (s)'
+    )
+    sms_nimba_sink_failure_rate = fields.Float(
+        related='company_id.sms_nimba_sink_failure_rate',
+        readonly=False,
+        string='Delivery Failure Rate'
+    )
+
     # Related fields from res.company
     sms_nimba_service_id = fields.Char(
         related='company_id.sms_nimba_service_id',
@@ -33,7 +66,104 @@ class ResConfigSettings(models.TransientModel):
         readonly=False,
         string='Sender Name'
     )
+    sms_nimba_pool_strategy = fields.Selection(
+        related='company_id.sms_nimba_pool_strategy',
+        readonly=False,
+        string='Pool Strategy'
+    )
+
+    # Campaign pacing
+    sms_nimba_pacing_mode = fields.Selection(
+        related='company_id.sms_nimba_pacing_mode',
+        readonly=False,
+        string='Pacing'
+    )
+    sms_nimba_pacing_rate = fields.Integer(
+        related='company_id.sms_nimba_pacing_rate',
+        readonly=False,
+        string='Messages per Minute'
+    )
+    sms_nimba_pacing_window = fields.Integer(
+        related='company_id.sms_nimba_pacing_window',
+        readonly=False,
+        string='Window (minutes)'
+    )
+    sms_nimba_quiet_hours = fields.Boolean(
+        related='company_id.sms_nimba_quiet_hours',
+        readonly=False,
+        string='Quiet Hours'
+    )
+    sms_nimba_quiet_hour_from = fields.Float(
+        related='company_id.sms_nimba_quiet_hour_from',
+        readonly=False,
+        string='Quiet From'
+    )
+    sms_nimba_quiet_hour_to = fields.Float(
+        related='company_id.sms_nimba_quiet_hour_to',
+        readonly=False,
+        string='Quiet To'
+    )
+    sms_nimba_profile_runs = fields.Integer(
+        related='company_id.sms_nimba_profile_runs',
+        readonly=False,
+        string='Profile Next Runs'
+    )
+    sms_nimba_profile_target = fields.Selection(
+        related='company_id.sms_nimba_profile_target',
+        readonly=False,
+        string='Profiling Target'
+    )
+
+    # Circuit breaker status (read-only)
+    sms_nimba_circuit_state = fields.Selection(
+        CIRCUIT_STATES,
+        string='Circuit Breaker',
+        compute='_compute_sms_nimba_circuit',
+    )
+    sms_nimba_circuit_last_error = fields.Char(
+        string='Last API Error',
+        compute='_compute_sms_nimba_circuit',
+    )
 
+    # Delivery statistics over the last 30 days (read-only)
+    sms_nimba_stats_sent = fields.Integer(string='Sent (30 days)', compute='_compute_sms_nimba_stats')
+    sms_nimba_stats_delivered = fields.Integer(string='Delivered (30 days)', compute='_compute_sms_nimba_stats')
+    sms_nimba_stats_failed = fields.Integer(string='Failed (30 days)', compute='_compute_sms_nimba_stats')
+    sms_nimba_stats_pending = fields.Integer(string='Pending (30 days)', compute='_compute_sms_nimba_stats')
+
+    @api.depends('company_id')
+    def _compute_sms_nimba_stats(self):
+        Stats = self.env['sms.nimba.stats'].sudo()
+        for settings in self:
+            totals = Stats._get_company_totals(settings.company_id)
+            settings.sms_nimba_stats_sent = totals['sent']
+            settings.sms_nimba_stats_delivered = totals['delivered']
+            settings.sms_nimba_stats_failed = totals['failed']
+            settings.sms_nimba_stats_pending = totals['pending']
+
+    # Send-to-delivery latency over the last 24 hours (read-only)
+    sms_nimba_latency_p50 = fields.Float(string='Latency p50 (s)', compute='_compute_sms_nimba_latency')
+    sms_nimba_latency_p90 = fields.Float(string='Latency p90 (s)', compute='_compute_sms_nimba_latency')
+    sms_nimba_latency_p99 = fields.Float(string='Latency p99 (s)', compute='_compute_sms_nimba_latency')
+    sms_nimba_failure_rate = fields.Float(string='Failure Rate (24 hours)', compute='_compute_sms_nimba_latency')
+
+    @api.depends('company_id')
+    def _compute_sms_nimba_latency(self):
+        Latency = self.env['sms.nimba.latency'].sudo()
+        for settings in self:
+            total = Latency._get_report(settings.company_id, hours=24)['total']
+            settings.sms_nimba_latency_p50 = total['p50'] or 0.0
+            settings.sms_nimba_latency_p90 = total['p90'] or 0.0
+            settings.sms_nimba_latency_p99 = total['p99'] or 0.0
+            settings.sms_nimba_failure_rate = (total['failure_rate'] or 0.0) * 100
+
+    @api.depends('company_id')
+    def _compute_sms_nimba_circuit(self):
+        Circuit = self.env['sms.nimba.circuit'].sudo()
+        for settings in self:
+            circuit = Circuit.search([('company_id', '=', settings.company_id.id)], limit=1)
+            settings.sms_nimba_circuit_state = circuit.state or 'closed'
+            settings.sms_nimba_circuit_last_error = circuit.last_error
 
     def action_open_nimba_sms_manage(self):
         """
@@ -42,3 +172,30 @@ class ResConfigSettings(models.TransientModel):
         """
         self.ensure_one()
         return self.company_id._action_open_nimba_sms_manage()
+
+    def action_open_nimba_sms_account_pool(self):
+        """Proxy method to open the company's Nimba SMS account pool."""
+        self.ensure_one()
+        return self.company_id._action_open_nimba_sms_account_pool()
+
+    def action_open_nimba_sms_stats(self):
+        """Open the per-batch delivery statistics of the company."""
+        self.ensure_one()
+        return {
+            'type': 'ir.actions.act_window',
+            'name': _('Nimba SMS Delivery Statistics'),
+            'res_model': 'sms.nimba.stats',
+            'view_mode': 'list,pivot',
+            'domain': [('company_id', '=', self.company_id.id)],
+        }
+
+    def action_open_nimba_sms_profiles(self):
+        """Proxy method to open the company's Nimba SMS profile reports."""
+        self.ensure_one()
+        return self.company_id._action_open_nimba_sms_profiles()
+
+    def action_reset_nimba_sms_circuit(self):
+        """Close the company's circuit breaker so queued SMS are sent again."""
+        self.ensure_one()
+        self.env['sms.nimba.circuit'].sudo()._set_state(self.company_id, 'closed')
+        return True
@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+
+import logging
+import threading
+import time
+
+from psycopg2 import errors as pg_errors
+
+from odoo import api, fields, models
+
+_logger = logging.getLogger(__name__)
+
+# Smooth weighted round-robin state, keyed by (dbname, account id). Kept per
+# process: each process spreads its own batches in the configured proportions,
+# so the traffic of all processes together follows them too. Loads and rate
+# limits are account-wide (see ``sms.nimba.account.usage``).
+_LOAD_LOCK = threading.Lock()
+_CURRENT_WEIGHTS = {}    # (dbname, account_id) -> smooth weighted round-robin weight
+
+USAGE_ATTEMPTS = 3
+
+
+class SmsNimbaAccount(models.Model):
+    """
+    A Nimba SMS service account belonging to a company's sending pool.
+
+    Companies may register several accounts; batches are spread across the
+    healthy ones according to the company's pool strategy. Accounts returning
+    authentication or balance errors are drained automatically.
+    """
+    _name = 'sms.nimba.account'
+    _description = 'Nimba SMS Service Account'
+    _order = 'company_id, sequence, id'
+
+    name = fields.Char(string='Name', required=True)
+    sequence = fields.Integer(default=10)
+    active = fields.Boolean(default=True)
+    company_id = fields.Many2one(
+        'res.company',
+        string='Company',
+        required=True,
+        index=True,
+        ondelete='cascade',
+        default=lambda self: self.env.company,
+    )
+    service_id = fields.Char(
+        string='Service ID',
+        required=True,
+        groups='base.group_system',
+        help='Service ID from your Nimba SMS dashboard'
+    )
+    secret_token = fields.Char(
+        string='Secret Token',
+        required=True,
+        groups='base.group_system',
+        help='Secret Token from your Nimba SMS dashboard'
+    )
+    sender_name = fields.Char(
+        string='Sender Name',
+        required=True,
+        groups='base.group_system',
+        help='Your approved sender name or short code'
+    )
+    weight = fields.Integer(
+        string='Weight',
+        default=1,
+        help='Relative share of the traffic this account receives'
+    )
+    rate_limit = fields.Integer(
+        string='Rate Limit (SMS/min)',
+        default=0,
+        help='Soft limit of messages per minute sent through this account, all workers together. '
+             'Saturated accounts are only used when every account of the pool is saturated. '
+             '0 means unlimited.'
+    )
+    health_state = fields.Selection(
+        selection=[
+            ('healthy', 'Healthy'),
+            ('drained', 'Drained'),
+        ],
+        string='Health',
+        default='healthy',
+        required=True,
+        readonly=True,
+    )
+    drained_reason = fields.Char(string='Drain Reason', readonly=True)
+    drained_date = fields.Datetime(string='Drained On', readonly=True)
+
+    _weight_positive = models.Constraint(
+        'CHECK(weight > 0)',
+        'The weight of a Nimba SMS account must be strictly positive.',
+    )
+
+    # ------------------------------------------------------------------
+    # POOL SELECTION
+    # ------------------------------------------------------------------
+
+    def _load_key(self):
+        return (self.env.cr.dbname, self.id)
+
+    @api.model
+    def _select_account(self, accounts, strategy='weighted', count=0):
+        """
+        Pick the account that should send the next batch and count the batch
+        against its rate limit.
+
+        Loads are read and the batch is counted in a short transaction of its
+        own, so that concurrent senders see each other's traffic right away.
+
+        :param accounts: candidate sms.nimba.account recordset (healthy accounts)
+        :param strategy: 'weighted' (smooth weighted round-robin) or 'least_loaded'
+        :param count: number of messages about to be sent through the account
+        :return: single sms.nimba.account record, or empty recordset
+        """
+        if not accounts:
+            return self.browse()
+
+        for attempt in range(1, USAGE_ATTEMPTS + 1):
+            try:
+                with self.env.registry.cursor() as cr:
+                    Usage = self.env(cr=cr, su=True)['sms.nimba.account.usage']
+                    account = self._pick_account(accounts, strategy, Usage._get_loads(accounts.ids))
+                    if count:
+                        Usage._add(account.id, count)
+                return account
+            except pg_errors.SerializationFailure:
+                # Another sender counted a batch on the same account meanwhile
+                time.sleep(0.01 * attempt)
+        _logger.warning(f"Nimba SMS account usage busy, {count} messages not counted against the rate limit")
+        return self._pick_account(accounts, strategy, {})
+
+    @api.model
+    def _pick_account(self, accounts, strategy, loads):
+        """
+        :param loads: dict {account id: messages sent in the current minute}
+        """
+        available = accounts.filtered(lambda a: not a.rate_limit or loads.get(a.id, 0) < a.rate_limit)
+        if not available:
+            _logger.info("All Nimba SMS accounts are over their rate limit, using the least loaded one")
+            available = accounts
+
+        if strategy == 'least_loaded':
+            return min(available, key=lambda a: (loads.get(a.id, 0) / a.weight, a.sequence, a.id))
+
+        # Smooth weighted round-robin (as used by nginx): every candidate
+        # gains its weight, the highest is picked and pays back the total.
+        with _LOAD_LOCK:
+            total = sum(available.mapped('weight'))
+            best = None
+            for account in available:
+                key = account._load_key()
+                _CURRENT_WEIGHTS[key] = _CURRENT_WEIGHTS.get(key, 0) + account.weight
+                if best is None or _CURRENT_WEIGHTS[key] > _CURRENT_WEIGHTS[best._load_key()]:
+                    best = account
+            _CURRENT_WEIGHTS[best._load_key()] -= total
+        return best
+
+    # ------------------------------------------------------------------
+    # HEALTH
+    # ------------------------------------------------------------------
+
+    def _drain(self, reason):
+        """
+        Take the accounts out of the pool until an administrator restores them.
+
+        The drain is committed in its own short transaction: it must survive
+        a rollback of the sending transaction, and must not keep the account
+        rows locked while the rest of the batch is sent.
+        """
+        for account in self:
+            _logger.warning(f"Draining Nimba SMS account {account.id} ({account.name}): {reason}")
+        with self.env.registry.cursor() as cr:
+            self.with_env(self.env(cr=cr, su=True)).write({
+                'health_state': 'drained',
+                'drained_reason': reason,
+                'drained_date': fields.Datetime.now(),
+            })
+
+    def action_restore(self):
+        """Put drained accounts back into the sending pool."""
+        self.write({
+            'health_state': 'healthy',
+            'drained_reason': False,
+            'drained_date': False,
+        })
+        return True
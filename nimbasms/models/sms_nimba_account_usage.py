@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+
+from odoo import api, fields, models
+
+# Minutes of usage kept, e.g. to look at the recent spread over the pool
+USAGE_RETENTION = 60
+
+
+class SmsNimbaAccountUsage(models.Model):
+    """
+    Messages sent through each pooled Nimba SMS account, per minute.
+
+    Shared by every process sending for the database (cron workers and
+    ``nimba_sender``), so that the rate limit and the load seen by the pool
+    strategies are account-wide. Rows are written with raw upserts on short
+    dedicated cursors (see ``sms.nimba.account._select_account``).
+    """
+    _name = 'sms.nimba.account.usage'
+    _description = 'Nimba SMS Account Usage'
+    _order = 'minute desc, account_id'
+
+    account_id = fields.Many2one('sms.nimba.account', required=True, ondelete='cascade', readonly=True)
+    minute = fields.Datetime(required=True, readonly=True)
+    sent_count = fields.Integer(string='Sent', readonly=True)
+
+    _account_minute_uniq = models.Constraint(
+        'UNIQUE(account_id, minute)',
+        'Nimba SMS account usage must be unique per account and minute.',
+    )
+
+    @api.model
+    def _get_loads(self, account_ids):
+        """Return {account id: messages sent in the current minute}."""
+        self.env.cr.execute("""
+            SELECT account_id, sent_count
+              FROM sms_nimba_account_usage
+             WHERE account_id = ANY(%s) AND minute = date_trunc('minute', now() at time zone 'UTC')
+        """, [list(account_ids)])
+        return dict(self.env.cr.fetchall())
+
+    @api.model
+    def _add(self, account_id, count):
+        """Count ``count`` messages sent through an account in the current minute."""
+        self.env.cr.execute("""
+            INSERT INTO sms_nimba_account_usage (account_id, minute, sent_count, create_date, write_date)
+                 VALUES (%s, date_trunc('minute', now() at time zone 'UTC'), %s,
+                         now() at time zone 'UTC', now() at time zone 'UTC')
+            ON CONFLICT (account_id, minute) DO UPDATE
+                    SET sent_count = sms_nimba_account_usage.sent_count + EXCLUDED.sent_count,
+                        write_date = EXCLUDED.write_date
+        """, [account_id, count])
+
+    @api.autovacuum
+    def _gc_usage(self):
+        self.env.cr.execute(
+            "DELETE FROM sms_nimba_account_usage WHERE minute < (now() at time zone 'UTC') - %s * interval '1 minute'",
+            [USAGE_RETENTION],
+        )
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+
+import hashlib
+
+from odoo import api, fields, models
+
+
+class SmsNimbaBatch(models.Model):
+    """
+    A message accepted by Nimba SMS, identified by its ``messageid``.
+
+    Nimba returns one messageid for all the recipients of a request. SMS,
+    trackers and statistics point to the batch through an integer foreign
+    key instead of repeating the 36 characters identifier on every row, and
+    webhook reports are resolved messageid -> batch -> SMS.
+    """
+    _name = 'sms.nimba.batch'
+    _description = 'Nimba SMS Batch'
+    _order = 'id desc'
+    _rec_name = 'messageid'
+
+    messageid = fields.Char(string='Nimba SMS ID', required=True, readonly=True)
+    company_id = fields.Many2one(
+        'res.company', index=True, ondelete='cascade', readonly=True,
+        help='Empty for batches migrated from messageids whose company could not be told; '
+             'their SMS company is used instead')
+    account_id = fields.Many2one('sms.nimba.account', string='Account', ondelete='set null', readonly=True)
+    sender_name = fields.Char(readonly=True)
+    send_date = fields.Datetime(string='Sent On', readonly=True, help='Time Nimba SMS accepted the message')
+    recipient_count = fields.Integer(string='Recipients', readonly=True)
+    body_hash = fields.Char(readonly=True, help='SHA-256 of the message body')
+    sms_ids = fields.One2many('sms.sms', 'sms_nimba_batch_id', string='SMS', readonly=True)
+    stats_ids = fields.One2many('sms.nimba.stats', 'batch_id', string='Statistics', readonly=True)
+
+    _messageid_uniq = models.Constraint(
+        'UNIQUE(messageid)',
+        'A Nimba SMS batch already exists for this message ID.',
+    )
+
+    @staticmethod
+    def _hash_body(body):
+        return hashlib.sha256((body or '').encode()).hexdigest()
+
+    @api.model
+    def _get_or_create(self, batches_vals):
+        """
+        Return the batches of the given messageids, creating the missing ones.
+
+        :param batches_vals: dict {messageid: values of the batch to create}
+        :return: dict {messageid: sms.nimba.batch record}
+        """
+        batches = self.search([('messageid', 'in', list(batches_vals))]).grouped('messageid')
+        missing = [
+            dict(vals, messageid=messageid)
+            for messageid, vals in batches_vals.items()
+            if messageid not in batches
+        ]
+        for batch in self.create(missing):
+            batches[batch.messageid] = batch
+        return batches
+
+    @api.model
+    def _find_id(self, messageid):
+        """Return the id of the batch of a Nimba messageid, or None."""
+        self.env.cr.execute("SELECT id FROM sms_nimba_batch WHERE messageid = %s", [messageid])
+        row = self.env.cr.fetchone()
+        return row[0] if row else None
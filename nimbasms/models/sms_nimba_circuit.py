@@ -0,0 +1,214 @@
+# -*- coding: utf-8 -*-
+
+import logging
+import time
+from datetime import timedelta
+
+from psycopg2 import errors as pg_errors
+
+from odoo import api, fields, models
+
+_logger = logging.getLogger(__name__)
+
+CIRCUIT_STATES = [
+    ('closed', 'Closed'),
+    ('open', 'Open'),
+    ('half_open', 'Half-Open'),
+]
+
+# name -> (system parameter, type, default)
+CIRCUIT_PARAMS = {
+    'window': ('sms.nimba_breaker_window', int, 60),              # seconds of the rolling window
+    'min_calls': ('sms.nimba_breaker_min_calls', int, 5),         # calls in the window before tripping
+    'failure_rate': ('sms.nimba_breaker_failure_rate', float, 0.5),  # failed or slow ratio tripping it
+    'latency': ('sms.nimba_breaker_latency', float, 10.0),        # seconds after which a call counts as failed
+    'cooldown': ('sms.nimba_breaker_cooldown', int, 30),          # seconds before probing an open breaker
+}
+
+# Transactions tried before giving up on recording calls, see ``_record_calls``
+RECORD_ATTEMPTS = 5
+
+
+class SmsNimbaCircuit(models.Model):
+    """
+    Per-company circuit breaker around the Nimba SMS API.
+
+    The state lives in the database so every worker shares it. It is always
+    read and written through a dedicated short-lived cursor, so that breaker
+    updates are visible immediately and never depend on the outcome of the
+    sending transaction.
+
+    - closed: requests flow; failures and slow calls are counted over a rolling window
+    - open: requests are refused and SMS stay queued until the cooldown expires
+    - half_open: one worker probes the API; success closes the breaker, failure reopens it
+    """
+    _name = 'sms.nimba.circuit'
+    _description = 'Nimba SMS Circuit Breaker'
+    _rec_name = 'company_id'
+
+    company_id = fields.Many2one('res.company', required=True, ondelete='cascade', readonly=True)
+    state = fields.Selection(CIRCUIT_STATES, default='closed', required=True, readonly=True)
+    opened_at = fields.Datetime(readonly=True)
+    window_start = fields.Datetime(readonly=True)
+    window_calls = fields.Integer(readonly=True)
+    window_failures = fields.Integer(readonly=True)
+    last_latency = fields.Float(string='Last Latency (s)', readonly=True)
+    last_error = fields.Char(readonly=True)
+
+    _company_uniq = models.Constraint(
+        'UNIQUE(company_id)',
+        'Only one Nimba SMS circuit breaker per company is allowed.',
+    )
+
+    @api.model
+    def _get_circuit_params(self):
+        ICP = self.env['ir.config_parameter'].sudo()
+        params = {}
+        for name, (key, cast, default) in CIRCUIT_PARAMS.items():
+            try:
+                params[name] = cast(ICP.get_param(key, default))
+            except (TypeError, ValueError):
+                params[name] = default
+        return params
+
+    @api.model
+    def _allow_request(self, company, probe):
+        """
+        Tell whether SMS of ``company`` may be sent to the Nimba API now.
+
+        When an open breaker reaches the end of its cooldown, the calling
+        worker claims the half-open state and runs ``probe``; concurrent
+        workers keep being refused until the probe settles the state.
+
+        :param company: res.company record
+        :param probe: callable returning True when the API answers correctly
+        :return: True if the request may go through
+        """
+        params = self._get_circuit_params()
+        now = fields.Datetime.now()
+        try:
+            with self.env.registry.cursor() as cr:
+                cr.execute("SELECT state, opened_at FROM sms_nimba_circuit WHERE company_id = %s", [company.id])
+                row = cr.fetchone()
+                if not row or row[0] == 'closed':
+                    return True
+                state, opened_at = row
+                if opened_at and now < opened_at + timedelta(seconds=params['cooldown']):
+                    return False
+                # Cooldown elapsed (or a previous probe died): claim the probe
+                cr.execute("""
+                    UPDATE sms_nimba_circuit
+                       SET state = 'half_open', opened_at = %s, write_date = %s
+                     WHERE id = (SELECT id
+                                   FROM sms_nimba_circuit
+                                  WHERE company_id = %s AND state = %s AND opened_at IS NOT DISTINCT FROM %s
+                                    FOR UPDATE NOWAIT)
+                 RETURNING id
+                """, [now, now, company.id, state, opened_at])
+                claimed = cr.fetchone()
+        except (pg_errors.LockNotAvailable, pg_errors.SerializationFailure):
+            # Another worker is claiming the probe or recording a call
+            return False
+
+        if not claimed:
+            return False
+
+        healthy = False
+        try:
+            healthy = probe()
+        except Exception as e:
+            _logger.warning(f"Nimba SMS circuit probe failed for company {company.id}: {str(e)}")
+        self._set_state(company, 'closed' if healthy else 'open')
+        return healthy
+
+    @api.model
+    def _set_state(self, company, state, error=None):
+        """Force the breaker of ``company`` into ``state`` and reset its window."""
+        now = fields.Datetime.now()
+        with self.env.registry.cursor() as cr:
+            cr.execute("""
+                INSERT INTO sms_nimba_circuit (company_id, state, opened_at, window_start, window_calls,
+                                               window_failures, last_error, create_date, write_date)
+                     VALUES (%(company)s, %(state)s, %(opened_at)s, %(now)s, 0, 0, %(error)s, %(now)s, %(now)s)
+                ON CONFLICT (company_id) DO UPDATE
+                        SET state = EXCLUDED.state,
+                            opened_at = EXCLUDED.opened_at,
+                            window_start = EXCLUDED.window_start,
+                            window_calls = 0,
+                            window_failures = 0,
+                            last_error = COALESCE(EXCLUDED.last_error, sms_nimba_circuit.last_error),
+                            write_date = EXCLUDED.write_date
+            """, {
+                'company': company.id,
+                'state': state,
+                'opened_at': now if state != 'closed' else None,
+                'now': now,
+                'error': error,
+            })
+        _logger.info(f"Nimba SMS circuit breaker of company {company.id} is now {state}")
+
+    @api.model
+    def _record_calls(self, company, calls, failures, latency, error=None):
+        """
+        Account for Nimba API calls, aggregated by the caller (one flush per
+        batch), trip the breaker when needed and return its state.
+
+        Workers updating the same breaker concurrently are waited for, and
+        the transaction is retried when it conflicts with them.
+
+        :param company: res.company record
+        :param calls: number of calls
+        :param failures: how many of them failed or were slow
+        :param latency: duration of the last call in seconds
+        :param error: last error message, to display in the settings
+        :return: True if the breaker refuses requests after the update
+        """
+        params = self._get_circuit_params()
+        for attempt in range(1, RECORD_ATTEMPTS + 1):
+            now = fields.Datetime.now()
+            try:
+                with self.env.registry.cursor() as cr:
+                    cr.execute("""
+                        INSERT INTO sms_nimba_circuit (company_id, state, window_start, window_calls,
+                                                       window_failures, create_date, write_date)
+                             VALUES (%s, 'closed', %s, 0, 0, %s, %s)
+                        ON CONFLICT (company_id) DO NOTHING
+                    """, [company.id, now, now, now])
+                    cr.execute("""
+                        SELECT state, window_start, window_calls, window_failures
+                          FROM sms_nimba_circuit
+                         WHERE company_id = %s
+                           FOR UPDATE
+                    """, [company.id])
+                    state, window_start, window_calls, window_failures = cr.fetchone()
+                    if not window_start or window_start < now - timedelta(seconds=params['window']):
+                        window_start, window_calls, window_failures = now, 0, 0
+                    window_calls += calls
+                    window_failures += failures
+
+                    opened_at = None
+                    if (state == 'closed' and window_calls >= params['min_calls']
+                            and window_failures / window_calls >= params['failure_rate']):
+                        state, opened_at = 'open', now
+                        _logger.warning(
+                            f"Nimba SMS circuit breaker of company {company.id} opened: "
+                            f"{window_failures}/{window_calls} failed or slow calls"
+                        )
+
+                    cr.execute("""
+                        UPDATE sms_nimba_circuit
+                           SET state = %s, opened_at = COALESCE(%s, opened_at), window_start = %s,
+                               window_calls = %s, window_failures = %s, last_latency = %s,
+                               last_error = COALESCE(%s, last_error), write_date = %s
+                         WHERE company_id = %s
+                    """, [state, opened_at, window_start, window_calls, window_failures,
+                          latency, error, now, company.id])
+                    return state != 'closed'
+            except pg_errors.SerializationFailure:
+                # Another worker updated (or created) the breaker meanwhile
+                time.sleep(0.01 * attempt)
+        _logger.warning(
+            f"Nimba SMS circuit breaker of company {company.id} busy, "
+            f"{calls} calls ({failures} failed) not recorded"
+        )
+        return False
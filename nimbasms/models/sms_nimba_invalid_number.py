@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+
+from odoo import api, fields, models
+
+# Markers (lowercase) of Nimba delivery errors meaning the number will never
+# be reachable. Extend with the comma-separated 'sms.nimba_permanent_errors'
+# system parameter.
+NIMBA_PERMANENT_ERRORS = (
+    'invalid number',
+    'invalid destination',
+    'invalid msisdn',
+    'unknown subscriber',
+    'unallocated number',
+    'number does not exist',
+    'numéro invalide',
+    'numero invalide',
+)
+
+
+class SmsNimbaInvalidNumber(models.Model):
+    """
+    Phone numbers known to be invalid or undeliverable through Nimba SMS.
+
+    Numbers are stored in the format sent to the API (international, digits
+    only). The send path checks each batch against this registry with a
+    single query and fails hits locally as ``wrong_number_format`` instead
+    of spending an API call on them. Delete a line to allow a number again.
+    """
+    _name = 'sms.nimba.invalid.number'
+    _description = 'Nimba SMS Invalid Number'
+    _order = 'last_seen desc, id desc'
+    _rec_name = 'number'
+
+    number = fields.Char(required=True, readonly=True)
+    source = fields.Selection(
+        selection=[
+            ('delivery', 'Delivery Report'),
+        ],
+        required=True,
+        readonly=True,
+    )
+    error = fields.Char(readonly=True, help='Delivery error that registered the number')
+    hit_count = fields.Integer(string='Hits', default=1, readonly=True)
+    last_seen = fields.Datetime(readonly=True)
+
+    _number_uniq = models.Constraint(
+        'UNIQUE(number)',
+        'This number is already registered as invalid.',
+    )
+
+    @staticmethod
+    def _normalize_number(number):
+        """Return the digits-only form used as registry key."""
+        return ''.join(char for char in (number or '') if char.isdigit())
+
+    @api.model
+    def _filter_known_invalid(self, numbers):
+        """
+        Return the subset of ``numbers`` registered as invalid.
+
+        :param numbers: iterable of numbers in API format
+        :return: set of registered numbers
+        """
+        numbers = {self._normalize_number(number) for number in numbers} - {''}
+        if not numbers:
+            return set()
+        self.env.cr.execute(
+            "SELECT number FROM sms_nimba_invalid_number WHERE number = ANY(%s)",
+            [list(numbers)],
+        )
+        return {number for number, in self.env.cr.fetchall()}
+
+    @api.model
+    def _register(self, numbers, source, error=None):
+        """
+        Add ``numbers`` to the registry, or count a new hit for known ones.
+
+        :param numbers: iterable of phone numbers (any formatting)
+        :param source: 'delivery'
+        :param error: error message explaining why the numbers are invalid
+        """
+        numbers = sorted({self._normalize_number(number) for number in numbers} - {''})
+        if not numbers:
+            return
+        self.env.cr.execute("""
+            INSERT INTO sms_nimba_invalid_number (number, source, error, hit_count, last_seen,
+                                                  create_date, write_date)
+                 SELECT number, %(source)s, %(error)s, 1, %(now)s, %(now)s, %(now)s
+                   FROM unnest(%(numbers)s::varchar[]) AS number
+            ON CONFLICT (number) DO UPDATE
+                    SET hit_count = sms_nimba_invalid_number.hit_count + 1,
+                        last_seen = EXCLUDED.last_seen,
+                        error = COALESCE(EXCLUDED.error, sms_nimba_invalid_number.error),
+                        write_date = EXCLUDED.write_date
+        """, {
+            'numbers': numbers,
+            'source': source,
+            'error': error,
+            'now': fields.Datetime.now(),
+        })
+        self.invalidate_model()
+
+    @api.model
+    def _is_permanent_delivery_error(self, error_message):
+        """Whether a Nimba delivery error means the number is permanently unreachable."""
+        message = (error_message or '').lower()
+        if not message:
+            return False
+        extra = self.env['ir.config_parameter'].sudo().get_param('sms.nimba_permanent_errors', '')
+        markers = NIMBA_PERMANENT_ERRORS + tuple(
+            marker.strip().lower() for marker in extra.split(',') if marker.strip()
+        )
+        return any(marker in message for marker in markers)
@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+
+import bisect
+from collections import defaultdict
+from datetime import timedelta
+
+from odoo import api, fields, models
+from odoo.addons.nimbasms.tools import nimba_deltas
+
+# Upper bounds (seconds) of the latency buckets; one more bucket holds
+# everything above the last bound
+LATENCY_BUCKETS = (1, 2, 5, 10, 20, 30, 60, 120, 300, 600, 1800, 3600)
+
+
+class SmsNimbaLatency(models.Model):
+    """
+    Send-to-delivery latency histogram of Nimba SMS, per company and hour.
+
+    One row per (company, hour of the delivery report, latency bucket),
+    counting the reports whose delay since Nimba accepted the message falls
+    into the bucket. Percentiles and failure rates are derived from the
+    bucket counts, so reporting never reads ``sms.sms``.
+
+    Increments are applied after commit through a dedicated cursor (see
+    ``tools.nimba_deltas``), like ``sms.nimba.stats``.
+    """
+    _name = 'sms.nimba.latency'
+    _description = 'Nimba SMS Delivery Latency'
+    _order = 'hour desc, bucket'
+
+    company_id = fields.Many2one('res.company', required=True, index=True, ondelete='cascade', readonly=True)
+    hour = fields.Datetime(required=True, readonly=True)
+    bucket = fields.Integer(required=True, readonly=True, help='Index in LATENCY_BUCKETS')
+    delivered_count = fields.Integer(string='Delivered', readonly=True)
+    failed_count = fields.Integer(string='Failed', readonly=True)
+
+    _hour_bucket_uniq = models.Constraint(
+        'UNIQUE(company_id, hour, bucket)',
+        'Nimba SMS latency buckets must be unique per company and hour.',
+    )
+
+    # ------------------------------------------------------------------
+    # INCREMENTS
+    # ------------------------------------------------------------------
+
+    @api.model
+    def _add(self, company_id, latency, failed=False):
+        """
+        Schedule the count of one delivery report, applied once the current
+        transaction is committed.
+
+        :param latency: seconds between the acceptance of the message by
+                        Nimba SMS and its delivery report
+        """
+        if not company_id or latency is None:
+            return
+        hour = fields.Datetime.now().replace(minute=0, second=0, microsecond=0)
+        bucket = bisect.bisect_left(LATENCY_BUCKETS, max(latency, 0))
+        nimba_deltas.add(self.env.cr, self.env.registry, 'nimba_latency_deltas', self._apply_delta,
+                         (company_id, hour, bucket), (0, 1) if failed else (1, 0))
+
+    @staticmethod
+    def _apply_delta(cr, key, values):
+        cr.execute("""
+            INSERT INTO sms_nimba_latency (company_id, hour, bucket, delivered_count, failed_count,
+                                           create_date, write_date)
+                 VALUES (%s, %s, %s, %s, %s, now() at time zone 'UTC', now() at time zone 'UTC')
+            ON CONFLICT (company_id, hour, bucket) DO UPDATE
+                    SET delivered_count = sms_nimba_latency.delivered_count + EXCLUDED.delivered_count,
+                        failed_count = sms_nimba_latency.failed_count + EXCLUDED.failed_count,
+                        write_date = EXCLUDED.write_date
+        """, [*key, *values])
+
+    # ------------------------------------------------------------------
+    # READ
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _percentile(counts, ratio):
+        """
+        Estimate a percentile (in seconds) from bucket counts, interpolating
+        linearly inside the bucket; values above the last bound are reported
+        as the last bound.
+        """
+        total = sum(counts)
+        if not total:
+            return None
+        rank = ratio * total
+        cumulated = 0
+        for bucket, count in enumerate(counts):
+            if count and cumulated + count >= rank:
+                if bucket >= len(LATENCY_BUCKETS):
+                    return float(LATENCY_BUCKETS[-1])
+                lower = LATENCY_BUCKETS[bucket - 1] if bucket else 0
+                upper = LATENCY_BUCKETS[bucket]
+                return round(lower + (upper - lower) * (rank - cumulated) / count, 1)
+            cumulated += count
+        return float(LATENCY_BUCKETS[-1])
+
+    @api.model
+    def _summarize(self, delivered, failed):
+        """
+        :param delivered: delivered counts per bucket
+        :param failed: failed counts per bucket
+        :return: dict with counts, failure rate and delivery percentiles
+        """
+        delivered_total, failed_total = sum(delivered), sum(failed)
+        reports = delivered_total + failed_total
+        return {
+            'delivered': delivered_total,
+            'failed': failed_total,
+            'failure_rate': round(failed_total / reports, 4) if reports else None,
+            'p50': self._percentile(delivered, 0.5),
+            'p90': self._percentile(delivered, 0.9),
+            'p99': self._percentile(delivered, 0.99),
+        }
+
+    @api.model
+    def _get_report(self, company, hours=24):
+        """
+        Return the latency report of ``company`` over the last ``hours`` hours.
+
+        :return: dict with the overall summary under 'total', the summary of
+                 each hour under 'hours' (most recent first) and the bucket
+                 bounds in seconds under 'buckets'
+        """
+        self.flush_model()
+        since = fields.Datetime.now().replace(minute=0, second=0, microsecond=0) - timedelta(hours=hours - 1)
+        self.env.cr.execute("""
+            SELECT hour, bucket, delivered_count, failed_count
+              FROM sms_nimba_latency
+             WHERE company_id = %s AND hour >= %s
+        """, [company.id, since])
+        size = len(LATENCY_BUCKETS) + 1
+        per_hour = defaultdict(lambda: ([0] * size, [0] * size))
+        total = ([0] * size, [0] * size)
+        for hour, bucket, delivered, failed in self.env.cr.fetchall():
+            bucket = min(bucket, size - 1)
+            for counts in (per_hour[hour], total):
+                counts[0][bucket] += delivered
+                counts[1][bucket] += failed
+        return {
+            'buckets': list(LATENCY_BUCKETS),
+            'total': self._summarize(*total),
+            'hours': [
+                dict(self._summarize(*per_hour[hour]), hour=fields.Datetime.to_string(hour))
+                for hour in sorted(per_hour, reverse=True)
+            ],
+        }
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+
+from odoo import api, fields, models
+from odoo.addons.nimbasms.tools import nimba_blocklist
+from odoo.addons.nimbasms.tools.sms_api import SmsApiNimba
+
+
+class SmsNimbaOptout(models.Model):
+    """
+    Numbers that opted out of the SMS sent by a company through Nimba SMS.
+
+    Checked together with ``phone.blacklist`` by the pre-send filter of the
+    Nimba SMS API, whatever path queued the SMS.
+    """
+    _name = 'sms.nimba.optout'
+    _description = 'Nimba SMS Opt-Out'
+    _order = 'id desc'
+    _rec_name = 'number'
+
+    company_id = fields.Many2one(
+        'res.company',
+        string='Company',
+        required=True,
+        ondelete='cascade',
+        default=lambda self: self.env.company,
+    )
+    number = fields.Char(required=True, help='e.g. +224620000000; national numbers are read in the country of the company')
+    reason = fields.Char()
+
+    _company_number_uniq = models.Constraint(
+        'UNIQUE(company_id, number)',
+        'This number already opted out for this company.',
+    )
+    _company_write_date_idx = models.Index('(company_id, write_date)')
+
+    def _normalize_number(self, number, company):
+        """
+        Return ``number`` in the format sent to the Nimba API (international,
+        digits only), formatted like the send path does for ``company``.
+        Numbers phonenumbers cannot validate keep their digits only.
+        """
+        sms_api = SmsApiNimba(self.env)
+        sms_api._set_company(company)
+        return (sms_api._format_phone_number(number, strict=True)
+                or ''.join(char for char in number if char.isdigit()))
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        for vals in vals_list:
+            if vals.get('number'):
+                company = self.env['res.company'].browse(vals.get('company_id')) or self.env.company
+                vals['number'] = self._normalize_number(vals['number'], company)
+        records = super().create(vals_list)
+        nimba_blocklist.invalidate(self.env.cr.dbname)
+        return records
+
+    def write(self, vals):
+        if vals.get('number'):
+            if vals.get('company_id'):
+                company = self.env['res.company'].browse(vals['company_id'])
+            elif len(self.company_id) > 1:
+                # National numbers depend on the country of each company
+                for records in self.grouped('company_id').values():
+                    records.write(vals)
+                return True
+            else:
+                company = self.company_id or self.env.company
+            vals = dict(vals, number=self._normalize_number(vals['number'], company))
+        res = super().write(vals)
+        nimba_blocklist.invalidate(self.env.cr.dbname)
+        return res
+
+    def unlink(self):
+        res = super().unlink()
+        nimba_blocklist.invalidate(self.env.cr.dbname)
+        return res
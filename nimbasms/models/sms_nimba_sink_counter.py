@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+
+from odoo import api, fields, models
+
+
+class SmsNimbaSinkCounter(models.Model):
+    """
+    Counters of the shadow transport sink, shared by all the workers of the
+    database. Each process adds its deltas about once per second with raw
+    upserts on a short dedicated cursor (see ``tools.nimba_sink.flush``).
+    """
+    _name = 'sms.nimba.sink.counter'
+    _description = 'Nimba SMS Sink Counter'
+    _order = 'name'
+
+    name = fields.Char(required=True, readonly=True)
+    value = fields.Integer(readonly=True)
+
+    _name_uniq = models.Constraint(
+        'UNIQUE(name)',
+        'Nimba SMS sink counters must be unique.',
+    )
+
+    @api.model
+    def _add(self, deltas):
+        """Add ``deltas`` ({counter name: delta}) to the counters."""
+        names, values = zip(*sorted(deltas.items()))
+        self.env.cr.execute("""
+            INSERT INTO sms_nimba_sink_counter (name, value, create_date, write_date)
+                 SELECT name, value, now() at time zone 'UTC', now() at time zone 'UTC'
+                   FROM unnest(%s::varchar[], %s::int[]) AS delta(name, value)
+            ON CONFLICT (name) DO UPDATE
+                    SET value = sms_nimba_sink_counter.value + EXCLUDED.value,
+                        write_date = EXCLUDED.write_date
+        """, [list(names), list(values)])
+
+    @api.model
+    def _get_values(self):
+        """Return {counter name: value}."""
+        self.env.cr.execute("SELECT name, value FROM sms_nimba_sink_counter")
+        return dict(self.env.cr.fetchall())
+
+    @api.model
+    def _reset(self):
+        self.env.cr.execute("DELETE FROM sms_nimba_sink_counter")
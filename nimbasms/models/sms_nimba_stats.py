@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+
+from odoo import api, fields, models
+from odoo.addons.nimbasms.tools import nimba_deltas
+
+
+class SmsNimbaStats(models.Model):
+    """
+    Delivery counters per Nimba SMS batch, maintained incrementally.
+
+    One row per (Nimba SMS batch, day of sending). The send path
+    adds to ``sent_count`` and delivery webhooks add to ``delivered_count``
+    or ``failed_count``, so batch and company statistics are read without
+    scanning ``sms.sms`` or ``sms.tracker``.
+
+    Increments are collected during the transaction and applied after its
+    commit through a dedicated cursor (see ``tools.nimba_deltas``), so a
+    burst of delivery reports for the same batch never makes the webhook
+    transactions conflict on the counter row.
+    """
+    _name = 'sms.nimba.stats'
+    _description = 'Nimba SMS Delivery Statistics'
+    _order = 'day desc, id desc'
+    _rec_name = 'batch_id'
+
+    company_id = fields.Many2one('res.company', required=True, index=True, ondelete='cascade', readonly=True)
+    batch_id = fields.Many2one('sms.nimba.batch', string='Batch', required=True, ondelete='cascade', readonly=True)
+    sms_nimba_sid = fields.Char(string='Nimba SMS ID', related='batch_id.messageid')
+    day = fields.Date(required=True, index=True, readonly=True)
+    sent_count = fields.Integer(string='Sent', readonly=True)
+    delivered_count = fields.Integer(string='Delivered', readonly=True)
+    failed_count = fields.Integer(string='Failed', readonly=True)
+    pending_count = fields.Integer(string='Pending', compute='_compute_pending_count')
+
+    _batch_day_uniq = models.Constraint(
+        'UNIQUE(batch_id, day)',
+        'Nimba SMS statistics must be unique per batch and day.',
+    )
+
+    @api.depends('sent_count', 'delivered_count', 'failed_count')
+    def _compute_pending_count(self):
+        for stats in self:
+            stats.pending_count = max(stats.sent_count - stats.delivered_count - stats.failed_count, 0)
+
+    # ------------------------------------------------------------------
+    # INCREMENTS
+    # ------------------------------------------------------------------
+
+    @api.model
+    def _add(self, company_id, batch_id, sent=0, delivered=0, failed=0, day=None):
+        """
+        Schedule counter increments for a batch, applied once the current
+        transaction is committed.
+
+        :param day: day of sending; only given by the send path. Delivery
+                    increments go to the existing row of the batch.
+        """
+        if not company_id or not batch_id:
+            return
+        nimba_deltas.add(self.env.cr, self.env.registry, 'nimba_stats_deltas', self._apply_delta,
+                         (company_id, batch_id, day), (sent, delivered, failed))
+
+    @staticmethod
+    def _apply_delta(cr, key, values):
+        (company_id, batch_id, day), (sent, delivered, failed) = key, values
+        params = {
+            'company': company_id, 'batch': batch_id, 'day': day,
+            'sent': sent, 'delivered': delivered, 'failed': failed,
+        }
+        if not day:
+            cr.execute("""
+                UPDATE sms_nimba_stats
+                   SET sent_count = sent_count + %(sent)s,
+                       delivered_count = delivered_count + %(delivered)s,
+                       failed_count = failed_count + %(failed)s,
+                       write_date = now() at time zone 'UTC'
+                 WHERE id = (SELECT id FROM sms_nimba_stats
+                              WHERE batch_id = %(batch)s
+                           ORDER BY day DESC LIMIT 1)
+            """, params)
+            if cr.rowcount:
+                return
+            # Batch sent before statistics existed: start counting today
+            params['day'] = fields.Date.today()
+        cr.execute("""
+            INSERT INTO sms_nimba_stats (company_id, batch_id, day, sent_count, delivered_count,
+                                         failed_count, create_date, write_date)
+                 VALUES (%(company)s, %(batch)s, %(day)s, %(sent)s, %(delivered)s, %(failed)s,
+                         now() at time zone 'UTC', now() at time zone 'UTC')
+            ON CONFLICT (batch_id, day) DO UPDATE
+                    SET sent_count = sms_nimba_stats.sent_count + EXCLUDED.sent_count,
+                        delivered_count = sms_nimba_stats.delivered_count + EXCLUDED.delivered_count,
+                        failed_count = sms_nimba_stats.failed_count + EXCLUDED.failed_count,
+                        write_date = EXCLUDED.write_date
+        """, params)
+
+    # ------------------------------------------------------------------
+    # READ
+    # ------------------------------------------------------------------
+
+    @api.model
+    def _get_company_totals(self, company, days=30):
+        """
+        Return the counters of ``company`` over the last ``days`` days.
+
+        :return: dict with 'sent', 'delivered', 'failed' and 'pending' keys
+        """
+        self.flush_model()
+        self.env.cr.execute("""
+            SELECT COALESCE(SUM(sent_count), 0), COALESCE(SUM(delivered_count), 0), COALESCE(SUM(failed_count), 0)
+              FROM sms_nimba_stats
+             WHERE company_id = %s AND day >= (now() at time zone 'UTC')::date - %s
+        """, [company.id, days])
+        sent, delivered, failed = self.env.cr.fetchone()
+        return {
+            'sent': sent,
+            'delivered': delivered,
+            'failed': failed,
+            'pending': max(sent - delivered - failed, 0),
+        }
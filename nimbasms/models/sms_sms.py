@@ -1,24 +1,294 @@
 # -*- coding: utf-8 -*-
 
-from collections import defaultdict
+import logging
+import time
+from collections import defaultdict, deque
+from datetime import timedelta
 
-from odoo import fields, models
+import pytz
+
+from odoo import api, fields, models
+from odoo.addons.nimbasms.tools import nimba_profiler, nimba_sdk
+from odoo.addons.nimbasms.tools.sms_api import SmsApiNimba
+
+_logger = logging.getLogger(__name__)
+
+# Databases whose Nimba SMS dependencies were pre-warmed in this process
+_prewarmed_dbs = set()
+
+# Advisory lock namespace serializing send slot assignment per company
+NIMBA_PACING_LOCK = 0x4E494D42  # 'NIMB'
+
+# Cap on the cron wakeups scheduled for one paced campaign (one per minute)
+NIMBA_PACING_MAX_TRIGGERS = 24 * 60
+
+# SMS sent per queue run, same cap as the core queue
+NIMBA_QUEUE_LIMIT = 10000
 
 
 class SmsSms(models.Model):
     _inherit = 'sms.sms'
 
+    sms_nimba_batch_id = fields.Many2one(
+        'sms.nimba.batch',
+        string='Nimba SMS Batch',
+        help='Nimba SMS message (batch of recipients) this SMS was sent in',
+        readonly=True,
+        copy=False,
+        index='btree_not_null',
+        ondelete='set null',
+    )
     sms_nimba_sid = fields.Char(
         string='Nimba SMS ID',
         help='Message ID from Nimba SMS provider',
+        related='sms_nimba_batch_id.messageid',
+    )
+    sms_nimba_account_id = fields.Many2one(
+        'sms.nimba.account',
+        string='Nimba SMS Account',
+        help='Pooled Nimba SMS account the message was sent through',
+        readonly=True,
+        copy=False,
+        ondelete='set null',
+    )
+    sms_nimba_delivery_status = fields.Selection(
+        selection=[
+            ('received', 'Received'),
+            ('failed', 'Failed'),
+        ],
+        string='Nimba SMS Delivery Status',
+        help='Last delivery status reported by the Nimba SMS webhook',
         readonly=True,
         copy=False,
     )
+    sms_nimba_delivery_date = fields.Datetime(
+        string='Nimba SMS Delivery Date',
+        help='Time the first delivery report of the SMS was received',
+        readonly=True,
+        copy=False,
+    )
+
+    sms_nimba_company_id = fields.Many2one(
+        'res.company',
+        string='Nimba SMS Company',
+        help='Company sending the SMS through Nimba SMS, set when the SMS is queued',
+        readonly=True,
+        copy=False,
+        index='btree_not_null',
+    )
+    sms_nimba_send_after = fields.Datetime(
+        string='Nimba SMS Send Slot',
+        help='The SMS is not sent before this time (campaign pacing)',
+        readonly=True,
+        copy=False,
+        index='btree_not_null',
+    )
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        records.filtered(lambda s: s.state == 'outgoing')._nimba_assign_send_slots()
+        return records
+
+    def _nimba_group_by_company(self):
+        """Return the SMS routed through Nimba SMS, grouped by company."""
+        sms_by_company = defaultdict(lambda: self.env['sms.sms'])
+        for sms in self:
+            company = sms._get_sms_company()
+            if company.sms_provider == 'nimba':
+                sms_by_company[company] += sms
+        return sms_by_company
+
+    # ------------------------------------------------------------------
+    # PACING
+    # ------------------------------------------------------------------
+
+    def _nimba_assign_send_slots(self):
+        """
+        Tag queued SMS with their Nimba company and give each SMS of a
+        paced company a target send slot. SMS of companies without pacing
+        wake the queue up right away.
+
+        Slots follow the last slot already assigned to the company, one every
+        ``60 / rate`` seconds ('rate' mode) or evenly spread over the pacing
+        window ('window' mode), skipping quiet hours. Assignment is serialized
+        per company with an advisory lock so concurrent campaigns queue up
+        behind each other instead of overlapping.
+        """
+        cron = self.env.ref('sms.ir_cron_sms_scheduler_action', raise_if_not_found=False)
+        now = fields.Datetime.now()
+        for company, company_sms in self._nimba_group_by_company().items():
+            if company.sms_nimba_pacing_mode == 'none':
+                self.env.cr.execute(
+                    "UPDATE sms_sms SET sms_nimba_company_id = %s WHERE id = ANY(%s)",
+                    [company.id, company_sms.ids],
+                )
+                company_sms.invalidate_recordset(['sms_nimba_company_id'])
+                self._nimba_wakeup_queue()
+                continue
+
+            company_sms = company_sms.sorted('id')
+            if company.sms_nimba_pacing_mode == 'window':
+                window = max(company.sms_nimba_pacing_window, 1) * 60
+                interval = timedelta(seconds=window / len(company_sms))
+            else:
+                interval = timedelta(seconds=60 / max(company.sms_nimba_pacing_rate, 1))
+
+            self.env.cr.execute("SELECT pg_advisory_xact_lock(%s, %s)", [NIMBA_PACING_LOCK, company.id])
+            self.env.cr.execute("""
+                SELECT MAX(sms_nimba_send_after)
+                  FROM sms_sms
+                 WHERE sms_nimba_company_id = %s AND state = 'outgoing' AND sms_nimba_send_after IS NOT NULL
+            """, [company.id])
+            last_slot = self.env.cr.fetchone()[0]
+            next_slot = max(now, last_slot + interval) if last_slot else now
+
+            tz = pytz.timezone(company.partner_id.tz or 'UTC')
+            slots = []
+            for _sms in company_sms:
+                if company.sms_nimba_quiet_hours:
+                    next_slot = self._nimba_skip_quiet_hours(
+                        next_slot, tz, company.sms_nimba_quiet_hour_from, company.sms_nimba_quiet_hour_to)
+                slots.append(next_slot)
+                next_slot += interval
+
+            self.env.cr.execute("""
+                UPDATE sms_sms AS sms
+                   SET sms_nimba_send_after = slot.send_after,
+                       sms_nimba_company_id = %s
+                  FROM unnest(%s::int[], %s::timestamp[]) AS slot(id, send_after)
+                 WHERE sms.id = slot.id
+            """, [company.id, company_sms.ids, slots])
+            company_sms.invalidate_recordset(['sms_nimba_send_after', 'sms_nimba_company_id'])
+
+            # Wake the queue up every minute of the paced span
+            if cron:
+                first, last = slots[0], slots[-1]
+                minutes = min(int((last - first).total_seconds() // 60) + 1, NIMBA_PACING_MAX_TRIGGERS)
+                cron._trigger([first + timedelta(minutes=i) for i in range(minutes)])
+            _logger.info(
+                f"Nimba SMS pacing: {len(company_sms)} SMS of company {company.id} "
+                f"scheduled from {slots[0]} to {slots[-1]}"
+            )
+
+    @api.model
+    def _nimba_wakeup_queue(self):
+        """
+        Trigger the SMS queue cron right away instead of waiting for its
+        next scheduled run.
+
+        Triggers are coalesced: at most one per transaction, and none when a
+        due trigger of the cron is still pending, so a burst of enqueues
+        (one large campaign or many small transactions) wakes the queue once.
+        The cron runs after the commit, when the SMS are visible.
+        """
+        data = self.env.cr.precommit.data
+        if data.get('nimba_queue_wakeup'):
+            return
+        data['nimba_queue_wakeup'] = True
+        cron = self.env.ref('sms.ir_cron_sms_scheduler_action', raise_if_not_found=False)
+        if not cron:
+            return
+        self.env.cr.execute(
+            "SELECT 1 FROM ir_cron_trigger WHERE cron_id = %s AND call_at <= %s LIMIT 1",
+            [cron.id, fields.Datetime.now()],
+        )
+        if not self.env.cr.fetchone():
+            cron._trigger()
+
+    @staticmethod
+    def _nimba_skip_quiet_hours(slot, tz, hour_from, hour_to):
+        """
+        Move a UTC slot falling into the quiet hours to the end of them.
+
+        :param slot: naive UTC datetime
+        :param tz: pytz timezone in which quiet hours are expressed
+        :param hour_from: start of the quiet hours (float hours, e.g. 21.5)
+        :param hour_to: end of the quiet hours; may be lower than ``hour_from``
+                        when the quiet hours span midnight
+        :return: naive UTC datetime
+        """
+        if hour_from == hour_to:
+            return slot
+        local = pytz.utc.localize(slot).astimezone(tz).replace(tzinfo=None)
+        hour = local.hour + local.minute / 60 + local.second / 3600
+        if hour_from < hour_to:
+            quiet, days = hour_from <= hour < hour_to, 0
+        else:
+            quiet, days = hour >= hour_from or hour < hour_to, int(hour >= hour_from)
+        if not quiet:
+            return slot
+        end_minutes = min(int(round(hour_to * 60)), 24 * 60 - 1)
+        end_local = local.replace(hour=0, minute=0, second=0, microsecond=0) \
+            + timedelta(days=days, minutes=end_minutes)
+        return tz.localize(end_local).astimezone(pytz.utc).replace(tzinfo=None)
+
+    def _nimba_filter_due(self):
+        """Return the SMS whose pacing slot, if any, has been reached."""
+        now = fields.Datetime.now()
+        return self.filtered(lambda s: not s.sms_nimba_send_after or s.sms_nimba_send_after <= now)
 
     # ------------------------------------------------------------------
     # SEND
     # ------------------------------------------------------------------
 
+    @api.model
+    def _process_queue(self, ids=None):
+        """
+        Only send SMS whose pacing slot is due, and pre-warm Nimba SMS
+        dependencies on the first queue run of a worker once the
+        ``sms.nimba_prewarm`` parameter is set.
+
+        The due SMS are sent directly rather than through ``super()``: the
+        core method selects its own first ``NIMBA_QUEUE_LIMIT`` outgoing SMS
+        and intersects them with ``ids``, so a backlog of paced SMS not due
+        yet would hide every due SMS with a higher id.
+        """
+        if self.env.cr.dbname not in _prewarmed_dbs \
+                and self.env['ir.config_parameter'].sudo().get_param('sms.nimba_prewarm'):
+            _prewarmed_dbs.add(self.env.cr.dbname)
+            self._nimba_prewarm()
+
+        domain = [
+            ('state', '=', 'outgoing'),
+            ('to_delete', '!=', True),
+            '|', ('sms_nimba_send_after', '=', False),
+                 ('sms_nimba_send_after', '<=', fields.Datetime.now()),
+        ]
+        if ids:
+            domain.append(('id', 'in', ids))
+        due_ids = self.search(domain, order='id', limit=NIMBA_QUEUE_LIMIT).ids
+        if not due_ids:
+            return None
+        res = None
+        try:
+            res = self.browse(due_ids)._send(unlink_failed=False, unlink_sent=True, raise_exception=False)
+        except Exception:
+            _logger.exception("Failed processing SMS queue")
+        return res
+
+    @api.model
+    def _nimba_prewarm(self):
+        """
+        Load phone metadata for the countries of Nimba SMS companies and
+        open the pooled API connections of their accounts.
+        """
+        start = time.monotonic()
+        companies = self.env['res.company'].sudo().search([('sms_provider', '=', 'nimba')])
+        regions = {'GN'} | set(companies.country_id.mapped('code'))
+        credentials = set()
+        for company in companies:
+            if company._has_nimba_account_pool():
+                accounts = company._get_nimba_account_pool()
+                credentials.update(zip(accounts.mapped('service_id'), accounts.mapped('secret_token')))
+            elif company.sms_nimba_service_id and company.sms_nimba_secret_token:
+                credentials.add((company.sms_nimba_service_id, company.sms_nimba_secret_token))
+        nimba_sdk.prewarm(regions, credentials)
+        _logger.info(
+            f"Nimba SMS pre-warm done in {time.monotonic() - start:.3f}s "
+            f"({len(regions)} regions, {len(credentials)} connections)"
+        )
+
     def _split_by_api(self):
         """Route SMS to NimbaSMS or IAP based on company sms_provider."""
         sms_by_company = defaultdict(lambda: self.env['sms.sms'])
@@ -45,22 +315,70 @@ class SmsSms(models.Model):
         bypassing ``send()`` → ``_split_by_api()``.  When no ``sms_api``
         is present in the context we re-route through ``_split_by_api()``
         so that the provider selection (and ``_set_company``) is applied.
+
+        Batches routed to NimbaSMS are skipped while the company's circuit
+        breaker is open, and paced SMS are skipped until their send slot;
+        both stay ``outgoing`` for a later run. SMS locked by another
+        transaction (e.g. a ``nimba_sender`` process) are left to it. Runs
+        of a company with profiled runs left are profiled (see
+        ``res.company._nimba_profile``).
         """
-        if self.env.context.get('sms_api'):
-            return super()._send(
+        due_sms = self._nimba_filter_due()
+        if not due_sms:
+            return
+        sms_api = self.env.context.get('sms_api')
+        if sms_api:
+            if isinstance(sms_api, SmsApiNimba):
+                if not sms_api._nimba_circuit_allows():
+                    # Breaker open: leave the SMS untouched in the queue
+                    _logger.info(f"Nimba SMS circuit breaker open, keeping {len(due_sms)} SMS queued")
+                    return
+                due_sms = due_sms._nimba_lock_for_send()
+                if not due_sms:
+                    return
+            return super(SmsSms, due_sms)._send(
                 unlink_failed=unlink_failed,
                 unlink_sent=unlink_sent,
                 raise_exception=raise_exception,
             )
 
         # No sms_api in context → route through _split_by_api (same as send())
-        for sms_api, sms_records in self._split_by_api():
-            for batch_ids in sms_records._split_batch():
-                self.browse(batch_ids).with_context(sms_api=sms_api)._send(
-                    unlink_failed=unlink_failed,
-                    unlink_sent=unlink_sent,
-                    raise_exception=raise_exception,
-                )
+        start = time.monotonic()
+        routes = list(due_sms._split_by_api())
+        split_time = time.monotonic() - start
+        for sms_api, sms_records in routes:
+            company = sms_api.company if isinstance(sms_api, SmsApiNimba) else self.env['res.company']
+            with company._nimba_profile('queue') as profile:
+                if profile:
+                    profile.add_section('_split_by_api', split_time)
+                for batch_ids in sms_records._split_batch():
+                    self.browse(batch_ids).with_context(sms_api=sms_api)._send(
+                        unlink_failed=unlink_failed,
+                        unlink_sent=unlink_sent,
+                        raise_exception=raise_exception,
+                    )
+
+    def _nimba_lock_for_send(self):
+        """
+        Lock the SMS still outgoing before calling the Nimba API, skipping
+        those locked by another transaction, so that an SMS claimed by a
+        ``nimba_sender`` process (or another cron worker) is never sent twice.
+
+        :return: the SMS of ``self`` locked by the current transaction
+        """
+        if not self:
+            return self
+        self.flush_recordset(['state'])
+        self.env.cr.execute("""
+            SELECT id
+              FROM sms_sms
+             WHERE id = ANY(%s) AND state = 'outgoing'
+               FOR UPDATE SKIP LOCKED
+        """, [self.ids])
+        locked_ids = {row[0] for row in self.env.cr.fetchall()}
+        if len(locked_ids) < len(self):
+            _logger.info(f"Nimba SMS: {len(self) - len(locked_ids)} SMS claimed by another sender, skipped")
+        return self.filtered(lambda s: s.id in locked_ids)
 
     failure_type = fields.Selection(
         selection_add=[
@@ -77,30 +395,242 @@ class SmsSms(models.Model):
 
     def _handle_call_result_hook(self, results):
         """
-        Store the Nimba SMS provider message ID on both SMS and tracker.
+        Link SMS and trackers to the Nimba SMS batch of their provider message
+        ID, and count the accepted messages in the batch statistics.
 
         :param results: list of dicts in the form [{
             'uuid': Odoo's id of the SMS,
             'state': State of the SMS in Odoo,
             'sms_nimba_sid': Nimba SMS's id of the message,
+            'sms_nimba_account_id': pooled account used to send it (optional),
         }, ...]
         """
+        with nimba_profiler.section('_handle_call_result_hook'):
+            nimba_sms = self._nimba_link_batches(results)
+
+        # Call super for other SMS
+        super(SmsSms, self - nimba_sms)._handle_call_result_hook(results)
+
+    def _nimba_link_batches(self, results):
+        """
+        Link the Nimba SMS of ``results`` to their batches and count them in
+        the batch statistics.
+
+        :return: the SMS of ``self`` routed through Nimba SMS
+        """
         nimba_sms = self.filtered(
             lambda s: s._get_sms_company().sms_provider == 'nimba'
         )
         grouped_nimba_sms = nimba_sms.grouped("uuid")
+        sms_per_batch = defaultdict(lambda: self.env['sms.sms'])
+        account_per_batch = {}
 
         for result in results:
             sms = grouped_nimba_sms.get(result.get('uuid'))
             nimba_sid = result.get('sms_nimba_sid')
-
             if sms and nimba_sid:
-                # Store on SMS record
-                sms.write({'sms_nimba_sid': nimba_sid})
+                sms_per_batch[nimba_sid] += sms
+                account_per_batch[nimba_sid] = result.get('sms_nimba_account_id') or False
 
-                # Also store on tracker if it exists
-                if sms.sms_tracker_id:
-                    sms.sms_tracker_id.sms_nimba_sid = nimba_sid
+        if sms_per_batch:
+            now = fields.Datetime.now()
+            Batch = self.env['sms.nimba.batch'].sudo()
+            Account = self.env['sms.nimba.account'].sudo()
+            batches_vals = {}
+            for nimba_sid, batch_sms in sms_per_batch.items():
+                company = batch_sms[0]._get_sms_company().sudo()
+                account = Account.browse(account_per_batch[nimba_sid])
+                batches_vals[nimba_sid] = {
+                    'company_id': company.id,
+                    'account_id': account.id,
+                    'sender_name': account.sender_name if account else company.sms_nimba_sender_name,
+                    'send_date': now,
+                    'recipient_count': len(batch_sms),
+                    'body_hash': Batch._hash_body(batch_sms[0].body),
+                }
+            batches = Batch._get_or_create(batches_vals)
 
-        # Call super for other SMS
-        super(SmsSms, self - nimba_sms)._handle_call_result_hook(results)
+            # One write per batch; the messageid is unique across accounts,
+            # so webhook correlation stays account-agnostic
+            today = fields.Date.today()
+            for nimba_sid, batch_sms in sms_per_batch.items():
+                batch = batches[nimba_sid]
+                batch_sms.write({
+                    'sms_nimba_batch_id': batch.id,
+                    'sms_nimba_account_id': batch.account_id.id,
+                })
+                batch_sms.sms_tracker_id.write({'sms_nimba_batch_id': batch.id})
+                self.env['sms.nimba.stats']._add(batch.company_id.id, batch.id, sent=len(batch_sms), day=today)
+        return nimba_sms
+
+    # ------------------------------------------------------------------
+    # DELIVERY REPORTS
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _nimba_normalize_contact(number):
+        """Strip '+' prefix, spaces and dashes from a phone number for comparison."""
+        if not number:
+            return ''
+        return number.lstrip('+').replace(' ', '').replace('-', '')
+
+    def _get_nimba_company(self):
+        """Company the SMS was sent for: the company of its batch, or the SMS
+        company for batches migrated without a known company."""
+        self.ensure_one()
+        return self.sms_nimba_batch_id.company_id or self.sms_nimba_company_id or self._get_sms_company()
+
+    @api.model
+    def _nimba_match_delivery_reports(self, reports):
+        """
+        Find the SMS matching Nimba delivery reports, with one query for the
+        batches and one for their SMS whatever the number of reports.
+
+        NimbaSMS returns a single messageid for an entire batch of recipients:
+        the messageid is resolved to its ``sms.nimba.batch`` and the contact
+        number of the report identifies the SMS inside the batch. Reports whose
+        contact matches no SMS fall back to the first undelivered SMS of the
+        batch matched by no other report, or else to the first SMS of the
+        batch. Exact matches are resolved first, so the result does not
+        depend on the order of the reports.
+
+        :param reports: list of (messageid, contact) tuples
+        :return: list of sms.sms records (empty when not found), in the order
+                 of ``reports``
+        """
+        matches = [self.browse()] * len(reports)
+        messageids = list({messageid for messageid, _contact in reports if messageid})
+        if not messageids:
+            return matches
+        self.env.cr.execute(
+            "SELECT messageid, id FROM sms_nimba_batch WHERE messageid = ANY(%s)", [messageids])
+        batch_ids = dict(self.env.cr.fetchall())
+        if not batch_ids:
+            return matches
+
+        self.flush_model(['sms_nimba_batch_id', 'number', 'state'])
+        self.env.cr.execute("""
+            SELECT id, sms_nimba_batch_id, number, state
+              FROM sms_sms
+             WHERE sms_nimba_batch_id = ANY(%s)
+          ORDER BY id
+        """, [list(batch_ids.values())])
+        by_contact, pending, first = {}, defaultdict(deque), {}
+        for sms_id, batch_id, number, state in self.env.cr.fetchall():
+            by_contact.setdefault((batch_id, self._nimba_normalize_contact(number)), sms_id)
+            first.setdefault(batch_id, sms_id)
+            if state not in ('sent', 'error'):
+                pending[batch_id].append(sms_id)
+
+        matched, unmatched = set(), []
+        for index, (messageid, contact) in enumerate(reports):
+            batch_id = batch_ids.get(messageid)
+            if not batch_id or batch_id not in first:
+                continue
+            sms_id = by_contact.get((batch_id, self._nimba_normalize_contact(contact)))
+            if sms_id:
+                matched.add(sms_id)
+                matches[index] = self.browse(sms_id)
+            else:
+                unmatched.append((index, batch_id))
+
+        for index, batch_id in unmatched:
+            candidates = pending[batch_id]
+            while candidates and candidates[0] in matched:
+                candidates.popleft()
+            sms_id = candidates[0] if candidates else first[batch_id]
+            matched.add(sms_id)
+            matches[index] = self.browse(sms_id)
+        return matches
+
+    def _nimba_record_deliveries(self, statuses, latency=True):
+        """
+        Remember the delivery status and time reported by Nimba and, on the
+        first report of each SMS, update the batch statistics and the
+        send-to-delivery latency histogram.
+
+        :param statuses: dict {sms id: Nimba status string}
+        :param latency: whether to count the delivery latency, i.e. whether
+                        the reports are received now (not imported later)
+        :return: the SMS of ``self`` for which this is the first report
+        """
+        first_reports = self.filtered(
+            lambda s: not s.sms_nimba_delivery_status and statuses.get(s.id) in ('received', 'failed'))
+        if not first_reports:
+            return first_reports
+        now = fields.Datetime.now()
+        for status, status_sms in first_reports.grouped(lambda s: statuses[s.id]).items():
+            status_sms.write({
+                'sms_nimba_delivery_status': status,
+                'sms_nimba_delivery_date': now,
+            })
+
+        counts = defaultdict(lambda: [0, 0])
+        for sms in first_reports:
+            failed = statuses[sms.id] == 'failed'
+            batch = sms.sms_nimba_batch_id
+            company_id = sms._get_nimba_company().id
+            counts[(company_id, batch.id)][int(failed)] += 1
+            if latency and batch.send_date:
+                self.env['sms.nimba.latency']._add(company_id, (now - batch.send_date).total_seconds(), failed=failed)
+        for (company_id, batch_id), (delivered, failed) in counts.items():
+            self.env['sms.nimba.stats']._add(company_id, batch_id, delivered=delivered, failed=failed)
+        return first_reports
+
+    @api.model
+    def _nimba_apply_delivery_reports(self, reports, latency=True):
+        """
+        Apply delivery reports with grouped writes, with the same effects as
+        the webhook: delivery status and statistics, invalid number registry,
+        and state of the tracker (or of the SMS itself when it has none).
+
+        Only the first report of each SMS is applied.
+
+        :param reports: list of (sms, status, contact, error) tuples, ``sms``
+                        being a single record
+        :param latency: see ``_nimba_record_deliveries``
+        :return: the SMS updated
+        """
+        statuses, details = {}, {}
+        for sms, status, contact, error in reports:
+            if sms.id not in statuses:
+                statuses[sms.id] = status
+                details[sms.id] = (contact, error)
+        updated = self.browse(list(statuses))._nimba_record_deliveries(statuses, latency=latency)
+        if not updated:
+            return updated
+
+        Invalid = self.env['sms.nimba.invalid.number'].sudo()
+        failed_numbers = defaultdict(list)
+        for sms in updated.filtered(lambda s: statuses[s.id] == 'failed'):
+            contact, error = details[sms.id]
+            if Invalid._is_permanent_delivery_error(error):
+                failed_numbers[error].append(contact or sms.number)
+        for error, numbers in failed_numbers.items():
+            Invalid._register(numbers, 'delivery', error=error)
+
+        trackers = self.env['sms.tracker'].sudo().search([
+            ('sms_uuid', 'in', [uuid for uuid in updated.mapped('uuid') if uuid]),
+        ]).grouped('sms_uuid')
+        tracked = self.browse()
+        groups = defaultdict(lambda: self.env['sms.tracker'].sudo())
+        for sms in updated:
+            tracker = trackers.get(sms.uuid) if sms.uuid else None
+            if tracker:
+                tracked += sms
+                status = statuses[sms.id]
+                error = (details[sms.id][1] or 'Delivery failed') if status == 'failed' else None
+                groups[(status, error)] += tracker
+        for (status, error), status_trackers in groups.items():
+            if status == 'failed':
+                status_trackers._action_update_from_nimba_error(error)
+            else:
+                status_trackers._action_update_from_sms_state('sent')
+
+        untracked = updated - tracked
+        for status, status_sms in untracked.grouped(lambda s: statuses[s.id]).items():
+            if status == 'failed':
+                status_sms.write({'state': 'error', 'failure_type': 'sms_delivery'})
+            else:
+                status_sms.write({'state': 'sent'})
+        return updated
@@ -6,7 +6,18 @@ from odoo import models, fields
 class SmsTracker(models.Model):
     _inherit = 'sms.tracker'
 
-    sms_nimba_sid = fields.Char(string='Nimba SMS Message ID', readonly=True, help='Message ID from Nimba SMS provider')
+    sms_nimba_batch_id = fields.Many2one(
+        'sms.nimba.batch',
+        string='Nimba SMS Batch',
+        readonly=True,
+        index='btree_not_null',
+        ondelete='set null',
+    )
+    sms_nimba_sid = fields.Char(
+        string='Nimba SMS Message ID',
+        help='Message ID from Nimba SMS provider',
+        related='sms_nimba_batch_id.messageid',
+    )
 
     def _action_update_from_nimba_error(self, error_message):
         """
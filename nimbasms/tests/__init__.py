@@ -1,2 +1,9 @@
 # -*- coding: utf-8 -*-
-# Tests module - placeholder for future tests
+
+from . import test_nimba_account_pool
+from . import test_nimba_blocklist
+from . import test_nimba_circuit
+from . import test_nimba_delivery_reports
+from . import test_nimba_pacing
+from . import test_nimba_sender
+from . import test_nimba_webhook
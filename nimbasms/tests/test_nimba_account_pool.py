@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from odoo.tests import TransactionCase, tagged
+
+from odoo.addons.nimbasms.tools.nimba_sink import SinkResponse
+from odoo.addons.nimbasms.tools.sms_api import SmsApiNimba
+
+
+@tagged('post_install', '-at_install')
+class TestNimbaAccountPool(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.company = cls.env.company
+        cls.company.write({
+            'sms_provider': 'nimba',
+            'sms_nimba_transport': 'shadow',
+            'sms_nimba_pacing_mode': 'none',
+            'sms_nimba_pool_strategy': 'least_loaded',
+        })
+        cls.account_a, cls.account_b = cls.env['sms.nimba.account'].create([{
+            'name': 'Account A',
+            'sequence': 1,
+            'company_id': cls.company.id,
+            'service_id': 'service-a',
+            'secret_token': 'token-a',
+            'sender_name': 'SenderA',
+        }, {
+            'name': 'Account B',
+            'sequence': 2,
+            'company_id': cls.company.id,
+            'service_id': 'service-b',
+            'secret_token': 'token-b',
+            'sender_name': 'SenderB',
+        }])
+
+    def setUp(self):
+        super().setUp()
+        # Pool bookkeeping goes through cursors of its own
+        self.registry_enter_test_mode()
+        self.sms_api = SmsApiNimba(self.env)
+        self.sms_api._set_company(self.company)
+        self.requests = []
+
+    def _patch_api(self, responses):
+        """Answer the requests of each service ID with ``responses[service_id]``."""
+        def get_client(sms_api, service_id, secret_token):
+            def create(to, sender_name, message):
+                self.requests.append((service_id, list(to)))
+                return responses[service_id]
+            return SimpleNamespace(messages=SimpleNamespace(create=create))
+        return patch.object(SmsApiNimba, '_get_nimba_client', autospec=True, side_effect=get_client)
+
+    def _send(self, number='+224622000001', uuid='pool-test-1'):
+        return self.sms_api._send_sms_batch([{
+            'content': 'Nimba pool test',
+            'numbers': [{'number': number, 'uuid': uuid}],
+        }])
+
+    def test_failover_drains_account(self):
+        responses = {
+            'service-a': SinkResponse(401, {'message': 'Invalid credentials'}),
+            'service-b': SinkResponse(201, {'messageid': 'pool-msg-1', 'url': ''}),
+        }
+        with self._patch_api(responses), \
+                patch.object(self.registry, 'cursor', wraps=self.registry.cursor) as cursor:
+            results = self._send()
+
+        self.assertEqual([service_id for service_id, _to in self.requests], ['service-a', 'service-b'],
+                         "The message is retried on the next account of the pool")
+        self.assertEqual(len(results), 1)
+        self.assertEqual(results[0]['state'], 'success')
+        self.assertEqual(results[0]['sms_nimba_account_id'], self.account_b.id)
+
+        # The drain is committed through a cursor of its own, hence visible
+        # from the sending transaction once its cache is invalidated
+        self.assertTrue(cursor.called)
+        self.env.invalidate_all()
+        self.assertEqual(self.account_a.health_state, 'drained')
+        self.assertEqual(self.account_a.drained_reason, 'Invalid credentials')
+        self.assertEqual(self.account_b.health_state, 'healthy')
+        self.assertEqual(self.company._get_nimba_account_pool(), self.account_b)
+
+    def test_all_accounts_drained(self):
+        responses = {
+            'service-a': SinkResponse(401, {'message': 'Invalid credentials'}),
+            'service-b': SinkResponse(402, {'message': 'Insufficient balance'}),
+        }
+        with self._patch_api(responses):
+            results = self._send()
+
+        self.assertEqual(len(self.requests), 2)
+        self.assertEqual(results[0]['state'], 'nimba_insufficient_balance')
+        self.env.invalidate_all()
+        self.assertEqual(set((self.account_a | self.account_b).mapped('health_state')), {'drained'})
+
+        # Further batches fail right away, without any request
+        with self._patch_api(responses):
+            results = self._send(uuid='pool-test-2')
+        self.assertEqual(len(self.requests), 2)
+        self.assertEqual(results[0]['state'], 'nimba_auth_error')
+
+        (self.account_a | self.account_b).action_restore()
+        self.assertEqual(self.company._get_nimba_account_pool(), self.account_a | self.account_b)
+
+    def test_rate_limit_is_shared(self):
+        self.account_a.rate_limit = 2
+        accounts = self.account_a | self.account_b
+        Account = self.env['sms.nimba.account']
+
+        self.assertEqual(Account._select_account(accounts, 'least_loaded', count=2), self.account_a)
+        # The usage is stored in the database: any worker now sees A saturated
+        self.assertEqual(Account._select_account(accounts, 'least_loaded', count=1), self.account_b)
+        loads = self.env['sms.nimba.account.usage']._get_loads(accounts.ids)
+        self.assertEqual(loads, {self.account_a.id: 2, self.account_b.id: 1})
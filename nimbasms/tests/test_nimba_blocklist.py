@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+
+from odoo.tests import TransactionCase, tagged
+
+from odoo.addons.nimbasms.tools import nimba_blocklist
+from odoo.addons.nimbasms.tools.sms_api import SmsApiNimba
+
+
+@tagged('post_install', '-at_install')
+class TestNimbaBlocklist(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.company = cls.env.company
+        cls.company.write({
+            'sms_provider': 'nimba',
+            'country_id': cls.env.ref('base.gn').id,
+        })
+        cls.env['phone.blacklist'].sudo()._add('+224622000001')
+        # National form: stored as sent to the API, in the company's country
+        cls.optout = cls.env['sms.nimba.optout'].create({'number': '622000002', 'company_id': cls.company.id})
+
+    def setUp(self):
+        super().setUp()
+        nimba_blocklist.invalidate(self.env.cr.dbname)
+        self.addCleanup(nimba_blocklist.invalidate, self.env.cr.dbname)
+        self.sms_api = SmsApiNimba(self.env)
+        self.sms_api._set_company(self.company)
+
+    def _use_filter(self, enabled):
+        self.env['ir.config_parameter'].sudo().set_param(
+            'sms.nimba_blocklist_filter_threshold', 0 if enabled else 1000000)
+
+    def _filter(self, numbers):
+        """Filter one message to ``numbers``; return (kept numbers, {number: rejected state})."""
+        uuid_map = {number: f'uuid-{number}' for number in numbers}
+        kept, rejected = self.sms_api._filter_blocked_recipients([('Nimba blocklist test', numbers, uuid_map)])
+        by_uuid = {uuid: number for number, uuid in uuid_map.items()}
+        return (
+            [number for _body, phone_numbers, _uuid_map in kept for number in phone_numbers],
+            {by_uuid[result['uuid']]: result['state'] for result in rejected},
+        )
+
+    def test_optout_number_normalized(self):
+        self.assertEqual(self.optout.number, '224622000002')
+        self.optout.number = '+224 622 00 00 05'
+        self.assertEqual(self.optout.number, '224622000005')
+
+    def _check_filter(self):
+        kept, rejected = self._filter(['224622000001', '224622000002', '224622000003'])
+        self.assertEqual(kept, ['224622000003'])
+        self.assertEqual(rejected, {
+            '224622000001': 'nimba_blacklisted',
+            '224622000002': 'nimba_optout',
+        })
+
+        # Blocked after the filter was built: the blacklist does not reset
+        # the filter, recent numbers are checked on write_date
+        self.env['phone.blacklist'].sudo()._add('+224622000003')
+        self.env.flush_all()
+        kept, rejected = self._filter(['224622000003', '224622000004'])
+        self.assertEqual(kept, ['224622000004'])
+        self.assertEqual(rejected, {'224622000003': 'nimba_blacklisted'})
+
+        # Opting out resets the filter
+        self.env['sms.nimba.optout'].create({'number': '+224622000004', 'company_id': self.company.id})
+        kept, rejected = self._filter(['224622000004'])
+        self.assertFalse(kept)
+        self.assertEqual(rejected, {'224622000004': 'nimba_optout'})
+
+    def test_filter_without_bloom(self):
+        self._use_filter(False)
+        self._check_filter()
+        self.assertIsNone(nimba_blocklist.get_filter(self.env.cr, self.company.id, 1000000, 300))
+
+    def test_filter_with_bloom(self):
+        self._use_filter(True)
+        self._check_filter()
+
+        bloom = nimba_blocklist.get_filter(self.env.cr, self.company.id, 0, 300)
+        self.assertIsNotNone(bloom)
+        for number in ('224622000001', '224622000002', '224622000004'):
+            self.assertIn(number, bloom)
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from odoo.tests import TransactionCase, freeze_time, tagged
+
+from odoo.addons.nimbasms.tools.nimba_sink import SinkResponse
+from odoo.addons.nimbasms.tools.sms_api import SmsApiNimba
+
+NOW = datetime(2026, 1, 15, 10, 0, 0)
+
+
+@tagged('post_install', '-at_install')
+class TestNimbaCircuit(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.company = cls.env.company
+        cls.company.write({
+            'sms_provider': 'nimba',
+            'sms_nimba_transport': 'shadow',
+            'sms_nimba_service_id': 'test-service',
+            'sms_nimba_secret_token': 'test-token',
+            'sms_nimba_sender_name': 'Test',
+            'sms_nimba_pacing_mode': 'none',
+        })
+        ICP = cls.env['ir.config_parameter'].sudo()
+        ICP.set_param('sms.nimba_breaker_min_calls', 2)
+        ICP.set_param('sms.nimba_breaker_failure_rate', 0.5)
+        ICP.set_param('sms.nimba_breaker_cooldown', 30)
+        cls.Circuit = cls.env['sms.nimba.circuit']
+
+    def setUp(self):
+        super().setUp()
+        # The breaker is read and written through cursors of its own
+        self.registry_enter_test_mode()
+
+    def _get_state(self):
+        self.env.invalidate_all()
+        return self.Circuit.search([('company_id', '=', self.company.id)]).state or 'closed'
+
+    def test_transitions(self):
+        with freeze_time(NOW):
+            self.assertFalse(self.Circuit._record_calls(self.company, 1, 1, 0.5, error='Server error'),
+                             "Too few calls in the window to trip the breaker")
+            self.assertEqual(self._get_state(), 'closed')
+
+            self.assertTrue(self.Circuit._record_calls(self.company, 1, 1, 0.5, error='Server error'))
+            self.assertEqual(self._get_state(), 'open')
+
+            probed = []
+            self.assertFalse(self.Circuit._allow_request(self.company, lambda: probed.append(True) or True),
+                             "An open breaker refuses requests during its cooldown")
+            self.assertFalse(probed)
+
+        with freeze_time(NOW + timedelta(seconds=31)):
+            def probe():
+                probed.append(self._get_state())
+                self.assertFalse(self.Circuit._allow_request(self.company, lambda: True),
+                                 "Other workers are refused while the probe runs")
+                return True
+
+            self.assertTrue(self.Circuit._allow_request(self.company, probe))
+            self.assertEqual(probed, ['half_open'])
+            self.assertEqual(self._get_state(), 'closed')
+            self.assertFalse(self.Circuit._record_calls(self.company, 1, 0, 0.5),
+                             "A closed breaker starts a new window")
+
+    def test_failed_probe_reopens(self):
+        with freeze_time(NOW):
+            self.assertTrue(self.Circuit._record_calls(self.company, 2, 2, 0.5))
+        with freeze_time(NOW + timedelta(seconds=31)):
+            self.assertFalse(self.Circuit._allow_request(self.company, lambda: False))
+            self.assertEqual(self._get_state(), 'open')
+            self.assertFalse(self.Circuit._allow_request(self.company, lambda: True),
+                             "The cooldown starts over")
+
+    def _send_batch(self, status_code):
+        """Send 4 messages answered with ``status_code``; return (results, _record_calls mock)."""
+        sms_api = SmsApiNimba(self.env)
+        sms_api._set_company(self.company)
+
+        def get_client(sms_api, service_id, secret_token):
+            def create(to, sender_name, message):
+                return SinkResponse(status_code, {'messageid': 'circuit-msg', 'url': '', 'message': 'Down'})
+            return SimpleNamespace(messages=SimpleNamespace(create=create))
+
+        messages = [{
+            'content': f'Nimba circuit test {i}',
+            'numbers': [{'number': f'+22462200000{i}', 'uuid': f'circuit-test-{i}'}],
+        } for i in range(4)]
+        Circuit = self.Circuit.__class__
+        with patch.object(SmsApiNimba, '_get_nimba_client', autospec=True, side_effect=get_client), \
+                patch.object(Circuit, '_record_calls', autospec=True, side_effect=Circuit._record_calls) as record_calls:
+            return sms_api._send_sms_batch(messages), record_calls
+
+    def test_batch_flushes_once(self):
+        results, record_calls = self._send_batch(201)
+
+        self.assertEqual({result['state'] for result in results}, {'success'})
+        self.assertEqual(len(results), 4)
+        self.assertEqual(record_calls.call_count, 1, "Healthy batches update the breaker once")
+        self.assertEqual(record_calls.call_args.args[2:4], (4, 0))
+        self.assertEqual(self._get_state(), 'closed')
+
+    def test_batch_stops_when_tripped(self):
+        results, record_calls = self._send_batch(500)
+
+        # Failed calls are flushed before the next message: the breaker trips
+        # after the second one and the rest of the batch stays queued
+        self.assertEqual({result['state'] for result in results}, {'server_error'})
+        self.assertEqual(len(results), 2)
+        self.assertEqual(record_calls.call_count, 2)
+        self.assertEqual(self._get_state(), 'open')
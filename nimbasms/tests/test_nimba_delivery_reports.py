@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+
+from odoo.tests import TransactionCase, tagged
+
+
+@tagged('post_install', '-at_install')
+class TestNimbaDeliveryReports(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.company = cls.env.company
+        cls.company.write({
+            'sms_provider': 'nimba',
+            'sms_nimba_pacing_mode': 'none',
+        })
+        cls.SmsSms = cls.env['sms.sms'].sudo()
+        cls.batch = cls.env['sms.nimba.batch'].create({
+            'messageid': 'report-msg-1',
+            'company_id': cls.company.id,
+            'recipient_count': 3,
+        })
+        cls.sms_a, cls.sms_b, cls.sms_c = cls.SmsSms.create([
+            {'number': f'+22462200000{i}', 'body': 'Nimba report test'} for i in range(1, 4)
+        ])
+        (cls.sms_a | cls.sms_b | cls.sms_c).write({
+            'state': 'pending',
+            'sms_nimba_batch_id': cls.batch.id,
+        })
+
+    def test_match_exact_before_fallback(self):
+        matches = self.SmsSms._nimba_match_delivery_reports([
+            ('report-msg-1', '+224620999999'),      # unknown contact: fallback
+            ('report-msg-1', '224622000001'),       # exact match, reported after the fallback
+            ('report-msg-1', '+224 622-000-003'),   # exact match once normalized
+            ('report-msg-unknown', '224622000001'),
+        ])
+
+        self.assertEqual(matches[1], self.sms_a)
+        self.assertEqual(matches[0], self.sms_b,
+                         "Fallbacks take the first pending SMS that no exact match claimed")
+        self.assertEqual(matches[2], self.sms_c)
+        self.assertFalse(matches[3])
+
+    def test_match_fallback_without_pending(self):
+        self.sms_a.state = 'sent'
+        matches = self.SmsSms._nimba_match_delivery_reports([
+            ('report-msg-1', '224622000002'),
+            ('report-msg-1', '224622000003'),
+            ('report-msg-1', '+224620999999'),
+        ])
+
+        self.assertEqual(matches, [self.sms_b, self.sms_c, self.sms_a],
+                         "Without pending SMS left, fallbacks take the first SMS of the batch")
+
+    def test_apply_first_report_only(self):
+        self.env['ir.config_parameter'].sudo().set_param('sms.nimba_permanent_errors', 'gone for good')
+
+        updated = self.SmsSms._nimba_apply_delivery_reports([
+            (self.sms_a, 'failed', '224622000001', 'Number gone for good'),
+            (self.sms_a, 'received', '224622000001', None),
+            (self.sms_b, 'received', '224622000002', None),
+        ])
+
+        self.assertEqual(updated, self.sms_a | self.sms_b)
+        self.assertEqual(self.sms_a.state, 'error')
+        self.assertEqual(self.sms_a.failure_type, 'sms_delivery')
+        self.assertEqual(self.sms_a.sms_nimba_delivery_status, 'failed')
+        self.assertEqual(self.sms_b.state, 'sent')
+        self.assertEqual(
+            self.env['sms.nimba.invalid.number']._filter_known_invalid(['224622000001', '224622000002']),
+            {'224622000001'},
+        )
+
+        # A replayed report changes nothing
+        updated = self.SmsSms._nimba_apply_delivery_reports([(self.sms_a, 'received', '224622000001', None)])
+        self.assertFalse(updated)
+        self.assertEqual(self.sms_a.state, 'error')
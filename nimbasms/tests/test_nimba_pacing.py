@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import pytz
+
+from odoo.tests import TransactionCase, freeze_time, tagged
+
+from odoo.addons.nimbasms.models import sms_sms
+
+NOW = datetime(2026, 1, 15, 10, 0, 0)
+
+
+@tagged('post_install', '-at_install')
+class TestNimbaPacing(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.company = cls.env.company
+        cls.company.write({
+            'sms_provider': 'nimba',
+            'sms_nimba_pacing_mode': 'window',
+            'sms_nimba_pacing_window': 10,
+            'sms_nimba_quiet_hours': False,
+        })
+        cls.company.partner_id.tz = 'UTC'
+        cls.SmsSms = cls.env['sms.sms']
+
+    def _create_sms(self, count):
+        return self.SmsSms.create([
+            {'number': f'+22462200{i:04d}', 'body': 'Nimba pacing test'}
+            for i in range(count)
+        ])
+
+    def test_skip_quiet_hours_same_day(self):
+        skip = self.SmsSms._nimba_skip_quiet_hours
+        self.assertEqual(skip(datetime(2026, 1, 15, 12, 30), pytz.utc, 12.0, 14.0), datetime(2026, 1, 15, 14, 0))
+        self.assertEqual(skip(datetime(2026, 1, 15, 14, 0), pytz.utc, 12.0, 14.0), datetime(2026, 1, 15, 14, 0))
+        self.assertEqual(skip(datetime(2026, 1, 15, 11, 59), pytz.utc, 12.0, 14.0), datetime(2026, 1, 15, 11, 59))
+        self.assertEqual(skip(datetime(2026, 1, 15, 12, 30), pytz.utc, 12.0, 12.0), datetime(2026, 1, 15, 12, 30),
+                         "Empty quiet hours never move a slot")
+
+    def test_skip_quiet_hours_overnight(self):
+        skip = self.SmsSms._nimba_skip_quiet_hours
+        # Before midnight: moved to the next morning
+        self.assertEqual(skip(datetime(2026, 1, 15, 22, 0), pytz.utc, 21.0, 7.0), datetime(2026, 1, 16, 7, 0))
+        # After midnight: moved to the same morning
+        self.assertEqual(skip(datetime(2026, 1, 16, 3, 0), pytz.utc, 21.0, 7.0), datetime(2026, 1, 16, 7, 0))
+        self.assertEqual(skip(datetime(2026, 1, 15, 20, 59), pytz.utc, 21.0, 7.0), datetime(2026, 1, 15, 20, 59))
+
+    def test_skip_quiet_hours_timezone(self):
+        # Quiet hours are local: 22:30 UTC is 23:30 in Paris (UTC+1 in January)
+        paris = pytz.timezone('Europe/Paris')
+        self.assertEqual(
+            self.SmsSms._nimba_skip_quiet_hours(datetime(2026, 1, 15, 22, 30), paris, 21.5, 7.5),
+            datetime(2026, 1, 16, 6, 30),
+        )
+        self.assertEqual(
+            self.SmsSms._nimba_skip_quiet_hours(datetime(2026, 1, 15, 20, 0), paris, 21.5, 7.5),
+            datetime(2026, 1, 15, 20, 0),
+        )
+
+    @freeze_time(NOW)
+    def test_window_spreads_slots(self):
+        sms = self._create_sms(5)
+
+        slots = sms.sorted('id').mapped('sms_nimba_send_after')
+        self.assertEqual(slots, [NOW + timedelta(minutes=2 * i) for i in range(5)])
+        self.assertEqual(set(sms.mapped('sms_nimba_company_id')), {self.company})
+
+    @freeze_time(NOW)
+    def test_window_follows_previous_campaign(self):
+        first = self._create_sms(5)
+        second = self._create_sms(2)
+
+        last_slot = max(first.mapped('sms_nimba_send_after'))
+        self.assertEqual(
+            second.sorted('id').mapped('sms_nimba_send_after'),
+            [last_slot + timedelta(minutes=5), last_slot + timedelta(minutes=10)],
+            "A new campaign is spread over its own window, after the slots already assigned",
+        )
+
+    @freeze_time(NOW)
+    def test_window_skips_quiet_hours(self):
+        self.company.write({
+            'sms_nimba_quiet_hours': True,
+            'sms_nimba_quiet_hour_from': 10.05,
+            'sms_nimba_quiet_hour_to': 11.0,
+        })
+        sms = self._create_sms(5)
+
+        self.assertEqual(sms.sorted('id').mapped('sms_nimba_send_after'), [
+            NOW, NOW + timedelta(minutes=2), datetime(2026, 1, 15, 11, 0),
+            datetime(2026, 1, 15, 11, 2), datetime(2026, 1, 15, 11, 4),
+        ])
+
+    @freeze_time(NOW)
+    def test_rate_spaces_slots(self):
+        self.company.write({'sms_nimba_pacing_mode': 'rate', 'sms_nimba_pacing_rate': 30})
+        sms = self._create_sms(3)
+
+        self.assertEqual(sms.sorted('id').mapped('sms_nimba_send_after'),
+                         [NOW, NOW + timedelta(seconds=2), NOW + timedelta(seconds=4)])
+
+    def test_filter_due(self):
+        with freeze_time(NOW):
+            sms = self._create_sms(3)
+        self.company.sms_nimba_pacing_mode = 'none'
+        unpaced = self._create_sms(1)
+        sms = sms.sorted('id')
+
+        # A 10 minutes window over 3 SMS: slots at NOW, NOW+200s and NOW+400s
+        with freeze_time(NOW + timedelta(seconds=200)):
+            self.assertEqual((sms + unpaced)._nimba_filter_due(), sms[:2] + unpaced)
+        with freeze_time(NOW + timedelta(seconds=199)):
+            self.assertEqual((sms + unpaced)._nimba_filter_due(), sms[:1] + unpaced)
+
+    def test_process_queue_sends_due_sms_behind_paced_backlog(self):
+        with freeze_time(NOW):
+            paced = self._create_sms(3)
+            paced.sms_nimba_send_after = NOW + timedelta(days=1)
+            self.company.sms_nimba_pacing_mode = 'none'
+            due = self._create_sms(1)
+
+            SmsSms = type(self.SmsSms)
+            with patch.object(sms_sms, 'NIMBA_QUEUE_LIMIT', 1), \
+                    patch.object(SmsSms, '_send', autospec=True) as send:
+                self.SmsSms._process_queue(ids=(paced + due).ids)
+
+        send.assert_called_once()
+        self.assertEqual(send.call_args.args[0], due)
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+
+import argparse
+import asyncio
+import base64
+import unittest
+
+from odoo import fields
+from odoo.tests import TransactionCase, tagged
+
+from odoo.addons.nimbasms.cli.nimba_sender import NimbaAsyncSender
+
+try:
+    import aiohttp
+    from aiohttp import web
+    from aiohttp.test_utils import TestServer
+except ImportError:
+    aiohttp = None
+
+
+@tagged('post_install', '-at_install')
+@unittest.skipIf(aiohttp is None, "aiohttp is not installed")
+class TestNimbaSender(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.company = cls.env.company
+        cls.company.write({
+            'sms_provider': 'nimba',
+            'sms_nimba_transport': 'live',
+            'sms_nimba_service_id': 'test-service',
+            'sms_nimba_secret_token': 'test-token',
+            'sms_nimba_sender_name': 'Test',
+            'sms_nimba_pacing_mode': 'none',
+        })
+
+    def setUp(self):
+        super().setUp()
+        self.registry_enter_test_mode()
+        self.sms = self.env['sms.sms'].create([
+            {'number': '+224622000001', 'body': 'Nimba sender test'},
+            {'number': '+224622000002', 'body': 'Nimba sender test'},
+        ])
+        self.requests = []
+
+    async def _handle_message(self, request):
+        self.requests.append((request.headers.get('Authorization'), await request.json()))
+        return web.json_response({'messageid': 'local-stand-in-1', 'url': ''}, status=201)
+
+    def _process_batch(self):
+        async def run():
+            app = web.Application()
+            app.router.add_post('/v1/messages', self._handle_message)
+            async with TestServer(app) as server, aiohttp.ClientSession() as session:
+                args = argparse.Namespace(
+                    batch_size=1000, concurrency=4, api_url=str(server.make_url('/v1')),
+                    timeout=30, poll_interval=1, once=True,
+                )
+                return await NimbaAsyncSender(args).process_batch(self.registry, session, asyncio.Semaphore(4))
+        return asyncio.run(run())
+
+    def test_process_batch(self):
+        processed = self._process_batch()
+
+        self.assertGreaterEqual(processed, 2)
+        self.assertEqual(len(self.requests), 1, "SMS sharing a body are sent in one request")
+        authorization, payload = self.requests[0]
+        self.assertEqual(authorization, 'Basic ' + base64.b64encode(b'test-service:test-token').decode())
+        self.assertEqual(sorted(payload['to']), ['224622000001', '224622000002'])
+        self.assertEqual(payload['message'], 'Nimba sender test')
+
+        self.env.invalidate_all()
+        batch = self.env['sms.nimba.batch'].search([('messageid', '=', 'local-stand-in-1')])
+        self.assertEqual(batch.recipient_count, 2)
+        self.assertEqual(self.sms.sms_nimba_batch_id, batch)
+        self.assertEqual(set(self.sms.mapped('state')), {'pending'})
+
+    def test_process_batch_circuit_open(self):
+        self.env['sms.nimba.circuit'].sudo().create({
+            'company_id': self.company.id,
+            'state': 'open',
+            'opened_at': fields.Datetime.now(),
+        })
+
+        self._process_batch()
+
+        self.assertFalse(self.requests, "SMS of a company whose breaker is open are not claimed")
+        self.env.invalidate_all()
+        self.assertEqual(set(self.sms.mapped('state')), {'outgoing'})
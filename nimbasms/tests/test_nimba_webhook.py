@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+
+import argparse
+from contextlib import nullcontext
+from unittest.mock import MagicMock, patch
+
+from psycopg2 import errors as pg_errors
+
+from odoo.tests import TransactionCase, tagged
+
+from odoo.addons.nimbasms.cli.nimba_import_reports import NimbaReportImporter
+from odoo.addons.nimbasms.controllers.webhook import NimbaSmsWebhook
+
+
+@tagged('post_install', '-at_install')
+class TestNimbaWebhookRouting(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.env['sms.nimba.batch'].create([
+            {'messageid': 'probe-msg-1', 'company_id': cls.env.company.id},
+            {'messageid': 'probe-msg-2', 'company_id': cls.env.company.id},
+        ])
+
+    def _db_connect(self, db_name):
+        """Stand-in for ``db_connect``: the test database is probed through the test cursor."""
+        if db_name == self.env.cr.dbname:
+            return MagicMock(cursor=lambda: nullcontext(self.env.cr))
+        if db_name == 'other_db':
+            # Database without the Nimba SMS module
+            connection = MagicMock()
+            connection.cursor.return_value.__enter__.return_value.execute.side_effect = \
+                pg_errors.UndefinedTable('relation "sms_nimba_batch" does not exist')
+            return connection
+        raise ConnectionError(f"database {db_name!r} does not exist")
+
+    def _patch_db_connect(self):
+        return patch('odoo.sql_db.db_connect', side_effect=self._db_connect)
+
+    def test_probe(self):
+        probe = NimbaSmsWebhook._probe_database_for_sids
+        with self._patch_db_connect():
+            self.assertEqual(
+                probe(self.env.cr.dbname, ['probe-msg-1', 'probe-msg-2', 'probe-msg-unknown']),
+                {'probe-msg-1', 'probe-msg-2'},
+            )
+            self.assertTrue(NimbaSmsWebhook._probe_database_for_sid(self.env.cr.dbname, 'probe-msg-1'))
+            self.assertFalse(NimbaSmsWebhook._probe_database_for_sid(self.env.cr.dbname, 'probe-msg-unknown'))
+            self.assertEqual(probe('other_db', ['probe-msg-1']), set(),
+                             "Databases without the module hold no batch")
+            self.assertEqual(probe('missing_db', ['probe-msg-1']), set(),
+                             "Unreachable databases are skipped")
+
+    def test_import_routing(self):
+        importer = NimbaReportImporter(argparse.Namespace(database=None))
+        databases = ['other_db', 'missing_db', self.env.cr.dbname]
+
+        with self._patch_db_connect() as db_connect:
+            routed = importer._route(databases, ['probe-msg-1', 'probe-msg-2', 'probe-msg-unknown'])
+            self.assertEqual(routed[self.env.cr.dbname], {'probe-msg-1', 'probe-msg-2'})
+            self.assertFalse(routed['other_db'] | routed['missing_db'])
+            self.assertEqual(db_connect.call_count, 3)
+
+            # Known messageids are routed from the cache, without probing
+            routed = importer._route(databases, ['probe-msg-2'])
+            self.assertEqual(dict(routed), {self.env.cr.dbname: {'probe-msg-2'}})
+            self.assertEqual(db_connect.call_count, 3)
+
+        # Probing stops once every messageid is routed
+        importer = NimbaReportImporter(argparse.Namespace(database=None))
+        with self._patch_db_connect() as db_connect:
+            routed = importer._route([self.env.cr.dbname, 'other_db'], ['probe-msg-1'])
+            self.assertEqual(dict(routed), {self.env.cr.dbname: {'probe-msg-1'}})
+            self.assertEqual(db_connect.call_count, 1)
@@ -1,3 +1,7 @@
 # -*- coding: utf-8 -*-
 
+from . import nimba_blocklist
+from . import nimba_deltas
+from . import nimba_profiler
+from . import nimba_sdk
 from . import sms_api
@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+"""
+In-memory membership filter over the numbers blocked for a company
+(``phone.blacklist`` and the company's Nimba SMS opt-out list).
+
+For very large lists, checking every recipient of every batch against the
+database is what costs. A Bloom filter built once per TTL answers "surely
+not blocked" for almost every recipient without any query; only the few
+possible hits are confirmed against the database. A Bloom filter has no
+false negatives, so nothing blocked at build time can slip through, and
+numbers blocked since the build (by any worker) are found with one query
+on ``write_date`` before the filter is trusted.
+"""
+
+import hashlib
+import math
+import threading
+import time
+from datetime import timedelta
+
+_lock = threading.Lock()
+_filters = {}  # (dbname, company_id) -> (expires_at, BloomFilter or None)
+
+LOAD_PAGE_SIZE = 50000
+# Rows are stamped with the start time of the transaction writing them, which
+# may commit after the filter is built: look back that far for recent numbers
+BUILD_MARGIN = 600  # seconds
+
+
+class BloomFilter:
+    """Minimal Bloom filter over strings."""
+
+    def __init__(self, capacity, error_rate=0.001):
+        capacity = max(capacity, 1)
+        self.size = max(int(-capacity * math.log(error_rate) / (math.log(2) ** 2)), 8)
+        self.hash_count = max(int(round(self.size / capacity * math.log(2))), 1)
+        self.bits = bytearray((self.size + 7) // 8)
+        self.built_at = None  # UTC datetime from which recent numbers must be checked
+
+    def _positions(self, value):
+        digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hash_count))
+
+    def add(self, value):
+        for position in self._positions(value):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, value):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(value))
+
+
+def _iter_blocked_numbers(cr, company_id):
+    """Yield the blocked numbers of a company (digits only), page by page."""
+    queries = [
+        ("SELECT id, number FROM phone_blacklist WHERE active AND id > %s ORDER BY id LIMIT %s", []),
+        ("SELECT id, number FROM sms_nimba_optout WHERE company_id = %s AND id > %s ORDER BY id LIMIT %s",
+         [company_id]),
+    ]
+    for query, params in queries:
+        last_id = 0
+        while True:
+            cr.execute(query, params + [last_id, LOAD_PAGE_SIZE])
+            rows = cr.fetchall()
+            if not rows:
+                break
+            for _id, number in rows:
+                yield (number or '').lstrip('+')
+            last_id = rows[-1][0]
+
+
+def get_filter(cr, company_id, threshold, ttl):
+    """
+    Return the membership filter of a company, rebuilding it after ``ttl``.
+
+    :param threshold: minimum number of blocked numbers for a filter to be
+                      worth it; below it, None is returned and the caller
+                      should query the database directly
+    :param ttl: seconds a filter (or the decision not to build one) is kept
+    :return: BloomFilter or None
+    """
+    key = (cr.dbname, company_id)
+    now = time.monotonic()
+    entry = _filters.get(key)
+    if entry and entry[0] > now:
+        return entry[1]
+
+    cr.execute("""
+        SELECT (SELECT COUNT(*) FROM phone_blacklist WHERE active)
+             + (SELECT COUNT(*) FROM sms_nimba_optout WHERE company_id = %s)
+    """, [company_id])
+    count = cr.fetchone()[0]
+    bloom = None
+    if count >= threshold:
+        # Leave room for the numbers blocked until the next refresh
+        bloom = BloomFilter(int(count * 1.2))
+        bloom.built_at = cr.now() - timedelta(seconds=BUILD_MARGIN)
+        for number in _iter_blocked_numbers(cr, company_id):
+            bloom.add(number)
+    with _lock:
+        _filters[key] = (now + ttl, bloom)
+    return bloom
+
+
+def get_recent_numbers(cr, company_id, since):
+    """
+    Return the numbers (digits only) blocked for a company since a filter
+    was built, with one query on the ``write_date`` indexes.
+    """
+    cr.execute("""
+        SELECT ltrim(number, '+') FROM phone_blacklist WHERE active AND write_date >= %s
+         UNION
+        SELECT number FROM sms_nimba_optout WHERE company_id = %s AND write_date >= %s
+    """, [since, company_id, since])
+    return {row[0] for row in cr.fetchall()}
+
+
+def invalidate(dbname, company_id=None):
+    """Drop cached filters of a database (or of one of its companies)."""
+    with _lock:
+        for key in list(_filters):
+            if key[0] == dbname and (company_id is None or key[1] == company_id):
+                del _filters[key]
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+"""
+Counter increments applied after commit, in their own transaction.
+
+Counter rows incremented by many concurrent transactions (delivery
+webhooks, queue workers) would make those transactions conflict. Instead,
+increments are summed per key during the transaction and applied once it
+is committed, through a dedicated cursor, in an order shared by all
+processes. Conflicting flushes are retried; increments that still cannot
+be applied are logged with their values instead of being dropped silently.
+"""
+
+import logging
+import random
+import time
+
+from psycopg2 import errors as pg_errors
+
+_logger = logging.getLogger(__name__)
+
+FLUSH_ATTEMPTS = 8
+RETRY_DELAY = 0.05  # seconds, doubled on each attempt
+
+
+def add(cr, registry, name, apply, key, values):
+    """
+    Add ``values`` to the increments of ``key`` collected under ``name`` in
+    the transaction of ``cr``.
+
+    :param name: name of the collection, e.g. 'nimba_stats_deltas'
+    :param apply: function(cr, key, values) applying the summed increments
+                  of one key; called after commit
+    :param values: tuple of numbers added position by position
+    """
+    data = cr.postcommit.data
+    if name not in data:
+        deltas = data[name] = {}
+        cr.postcommit.add(lambda: flush(registry, name, apply, deltas))
+    delta = data[name].setdefault(key, [0] * len(values))
+    for index, value in enumerate(values):
+        delta[index] += value
+
+
+def flush(registry, name, apply, deltas):
+    """Apply the increments of a committed transaction in their own transaction."""
+    # Any total order works as long as concurrent flushes lock rows in the same one
+    items = sorted(deltas.items(), key=lambda item: repr(item[0]))
+    for attempt in range(FLUSH_ATTEMPTS):
+        try:
+            with registry.cursor() as cr:
+                for key, values in items:
+                    apply(cr, key, values)
+            return
+        except (pg_errors.SerializationFailure, pg_errors.DeadlockDetected):
+            time.sleep(RETRY_DELAY * 2 ** attempt * random.uniform(0.5, 1.5))
+        except Exception:
+            _logger.exception(f"Failed to apply {name}")
+            break
+    _logger.error(f"Lost {len(items)} {name} after {attempt + 1} attempts: {items}")
@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+"""
+Opt-in profiler for Nimba SMS queue and webhook runs.
+
+A profile samples the stack of the profiled thread at a fixed interval,
+counts the SQL queries and their time (from the per-thread counters
+maintained by ``odoo.sql_db``) and accumulates the time spent waiting on
+the Nimba API and in named sections of the send path. Sections and network
+time are only recorded while a profile is active in the current thread, so
+the instrumentation costs nothing otherwise.
+"""
+
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from functools import wraps
+
+SAMPLE_INTERVAL = 0.005  # seconds
+MAX_STACK_DEPTH = 64
+REPORT_TOP = 25
+REPORT_STACKS = 500
+
+_local = threading.local()
+
+
+def _frame_label(code):
+    filename = '/'.join(code.co_filename.rsplit('/', 2)[-2:])
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})"
+
+
+class NimbaProfile:
+    """Profile of one run of the thread that created it."""
+
+    def __init__(self, name, interval=SAMPLE_INTERVAL):
+        self.name = name
+        self.interval = interval
+        self.thread = threading.current_thread()
+        self.stacks = Counter()
+        self.sections = defaultdict(lambda: [0, 0.0])  # name -> [calls, seconds]
+        self.network = [0, 0.0]
+        self._stop_event = threading.Event()
+        self._sampler = None
+
+    def start(self):
+        # odoo.sql_db only maintains the counters of threads that have them
+        for attribute, default in (('query_count', 0), ('query_time', 0.0)):
+            if not hasattr(self.thread, attribute):
+                setattr(self.thread, attribute, default)
+        self.start_time = datetime.now(timezone.utc)
+        self._start = time.monotonic()
+        self._queries = (self.thread.query_count, self.thread.query_time)
+        self._sampler = threading.Thread(target=self._sample, name='nimba_profiler', daemon=True)
+        self._sampler.start()
+
+    def stop(self):
+        self.duration = time.monotonic() - self._start
+        self.query_count = self.thread.query_count - self._queries[0]
+        self.query_time = self.thread.query_time - self._queries[1]
+        self._stop_event.set()
+        self._sampler.join()
+
+    def _sample(self):
+        ident = self.thread.ident
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(ident)
+            stack = []
+            while frame is not None and len(stack) < MAX_STACK_DEPTH:
+                stack.append(_frame_label(frame.f_code))
+                frame = frame.f_back
+            if stack:
+                self.stacks[tuple(reversed(stack))] += 1
+
+    def add_section(self, name, seconds):
+        section = self.sections[name]
+        section[0] += 1
+        section[1] += seconds
+
+    def add_network(self, seconds):
+        self.network[0] += 1
+        self.network[1] += seconds
+
+    def report(self):
+        """Return the profile as a JSON-serializable dict."""
+        self_counts, cumulative_counts = Counter(), Counter()
+        for stack, count in self.stacks.items():
+            self_counts[stack[-1]] += count
+            for label in set(stack):
+                cumulative_counts[label] += count
+        return {
+            'name': self.name,
+            'start': self.start_time.isoformat(),
+            'duration': round(self.duration, 6),
+            'sql': {'count': self.query_count, 'time': round(self.query_time, 6)},
+            'network': {'calls': self.network[0], 'time': round(self.network[1], 6)},
+            'sections': {
+                name: {'calls': calls, 'time': round(seconds, 6)}
+                for name, (calls, seconds) in self.sections.items()
+            },
+            'samples': {
+                'interval': self.interval,
+                'count': sum(self.stacks.values()),
+                'top_self': self_counts.most_common(REPORT_TOP),
+                'top_cumulative': cumulative_counts.most_common(REPORT_TOP),
+                # Collapsed stacks, e.g. for flamegraph.pl or speedscope
+                'stacks': [f"{';'.join(stack)} {count}" for stack, count in self.stacks.most_common(REPORT_STACKS)],
+            },
+        }
+
+
+def current():
+    """Return the profile active in the current thread, if any."""
+    return getattr(_local, 'profile', None)
+
+
+@contextmanager
+def profiling(name, interval=SAMPLE_INTERVAL):
+    """
+    Profile the enclosed code, unless a profile is already active in this
+    thread (nested runs are part of the outer profile).
+
+    :yield: the new NimbaProfile, or None when nested
+    """
+    if current() is not None:
+        yield None
+        return
+    profile = NimbaProfile(name, interval)
+    _local.profile = profile
+    profile.start()
+    try:
+        yield profile
+    finally:
+        profile.stop()
+        _local.profile = None
+
+
+@contextmanager
+def section(name):
+    """Time the enclosed code as a named section of the active profile."""
+    profile = current()
+    if profile is None:
+        yield
+        return
+    start = time.monotonic()
+    try:
+        yield
+    finally:
+        profile.add_section(name, time.monotonic() - start)
+
+
+def timed(name):
+    """Decorator timing each call of a function as a section of the active profile."""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with section(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def add_network(seconds):
+    """Count time spent waiting on the Nimba API in the active profile."""
+    profile = current()
+    if profile is not None:
+        profile.add_network(seconds)
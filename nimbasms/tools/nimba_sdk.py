@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""
+Lazy access to the Nimba SMS SDK and to phonenumbers.
+
+Both libraries are only imported when a worker actually validates a number
+or talks to Nimba SMS, so registry loads and workers that never send SMS do
+not pay for them. SDK clients are pooled per credentials so that successive
+batches reuse the same HTTP connection; the pool is keyed by a digest of
+the credentials (no secret token kept as a key) and bounded, the least
+recently used client being dropped first.
+"""
+
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+_logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_sdk = None             # (Client, NimbaSMSException) once imported
+_phonenumbers = None    # phonenumbers module once imported
+_clients = OrderedDict()  # digest of (service_id, secret_token) -> Client, least recently used first
+
+CLIENT_POOL_SIZE = 64
+
+
+def get_sdk():
+    """
+    Import the Nimba SMS SDK on first use.
+
+    :return: tuple (Client, NimbaSMSException); Client is None when the SDK
+             is not installed, in which case NimbaSMSException is Exception
+    """
+    global _sdk
+    if _sdk is None:
+        try:
+            from nimbasms import Client, NimbaSMSException
+        except ImportError:
+            _logger.warning("nimbasms library not found. Please install it: pip install nimbasms")
+            Client = None
+            NimbaSMSException = Exception
+        _sdk = (Client, NimbaSMSException)
+    return _sdk
+
+
+def get_phonenumbers():
+    """Import phonenumbers on first use and return the module."""
+    global _phonenumbers
+    if _phonenumbers is None:
+        import phonenumbers
+        _phonenumbers = phonenumbers
+    return _phonenumbers
+
+
+def get_client(service_id, secret_token):
+    """
+    Return a pooled SDK client for the given credentials.
+
+    :raise NimbaSMSException: when the client cannot be initialized
+    """
+    key = hashlib.sha256(f"{service_id}\0{secret_token}".encode()).digest()
+    with _lock:
+        client = _clients.get(key)
+        if client is not None:
+            _clients.move_to_end(key)
+            return client
+    Client = get_sdk()[0]
+    with _lock:
+        client = _clients.get(key)
+        if client is None:
+            client = _clients[key] = Client(service_id, secret_token)
+            while len(_clients) > CLIENT_POOL_SIZE:
+                _clients.popitem(last=False)
+    return client
+
+
+def prewarm(regions=(), credentials=()):
+    """
+    Load what the first send of a fresh worker would otherwise load lazily.
+
+    :param regions: ISO country codes whose phone metadata should be loaded
+    :param credentials: iterable of (service_id, secret_token) whose pooled
+                        client should be created and connected
+    """
+    phonenumbers = get_phonenumbers()
+    for region in regions:
+        phonenumbers.PhoneMetadata.metadata_for_region(region.upper())
+
+    Client, NimbaSMSException = get_sdk()
+    if Client is None:
+        return
+    for service_id, secret_token in credentials:
+        try:
+            # A cheap authenticated call opens the keep-alive connection
+            get_client(service_id, secret_token).accounts.get()
+        except NimbaSMSException as e:
+            _logger.warning(f"Nimba SMS pre-warm failed: {e}")
+        except Exception as e:
+            _logger.warning(f"Unexpected error during Nimba SMS pre-warm: {str(e)}")
@@ -0,0 +1,261 @@
+# -*- coding: utf-8 -*-
+"""
+Local sink standing in for the Nimba SMS API (shadow transport).
+
+``SinkClient`` mimics the parts of the SDK ``Client`` used by the module
+(``messages.create`` and ``accounts.get``). Requests are recorded in memory
+instead of being sent, with configurable latency and error rate, and can
+trigger synthetic delivery callbacks on the module webhook. This allows
+load testing the real queue, hooks and webhook without sending billed SMS.
+
+Counters are shared by all the workers of a database: each process adds its
+deltas to ``sms.nimba.sink.counter`` about once per second. Synthetic
+callbacks are posted by a single dispatcher thread per process from a
+bounded queue; reports that do not fit are dropped and counted as
+``callbacks_dropped``.
+"""
+
+import hashlib
+import heapq
+import hmac
+import itertools
+import json
+import logging
+import random
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict, deque
+
+import requests
+from psycopg2 import errors as pg_errors
+
+_logger = logging.getLogger(__name__)
+
+RECORD_SIZE = 10000
+CALLBACK_QUEUE_SIZE = 10000  # synthetic delivery reports waiting to be posted, per process
+FLUSH_INTERVAL = 1.0  # seconds between two flushes of the counters
+COUNTERS = ('requests', 'recipients', 'errors', 'callbacks', 'callback_errors', 'callbacks_dropped')
+
+_lock = threading.Lock()
+_wakeup = threading.Condition(_lock)
+_records = deque(maxlen=RECORD_SIZE)  # most recent requests of this process
+_pending_counts = defaultdict(Counter)  # dbname -> counter deltas not flushed yet
+_callbacks = []  # heap of (due, sequence, dbname, url, secret, payload)
+_sequence = itertools.count()
+_dispatcher = None
+
+
+class SinkResponse:
+    """Response object with the attributes the module reads on SDK responses."""
+
+    def __init__(self, status_code, data):
+        self.status_code = status_code
+        self.ok = status_code < 400
+        self.data = data
+        self.text = json.dumps(data)
+
+
+class _SinkMessages:
+
+    def __init__(self, client):
+        self._client = client
+
+    def create(self, to, sender_name, message):
+        return self._client._create_message(to, sender_name, message)
+
+
+class _SinkAccounts:
+
+    def __init__(self, client):
+        self._client = client
+
+    def get(self):
+        self._client._simulate_latency()
+        return SinkResponse(200, {'balance': 'shadow'})
+
+
+class SinkClient:
+    """
+    Drop-in replacement of the Nimba SDK client for the shadow transport.
+
+    :param latency: simulated response time in milliseconds
+    :param error_rate: probability (0-1) that a request fails with a server error
+    :param callback_url: webhook URL receiving synthetic delivery reports, if any
+    :param callback_secret: secret used to sign synthetic delivery reports
+    :param callback_delay: seconds between the request and its delivery reports
+    :param failure_rate: probability (0-1) that a delivery report is 'failed'
+    :param dbname: database the counters are stored in
+    """
+
+    def __init__(self, latency=0, error_rate=0.0, callback_url=None, callback_secret=None,
+                 callback_delay=1.0, failure_rate=0.0, dbname=None):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.callback_url = callback_url
+        self.callback_secret = callback_secret
+        self.callback_delay = callback_delay
+        self.failure_rate = failure_rate
+        self.dbname = dbname
+        self.messages = _SinkMessages(self)
+        self.accounts = _SinkAccounts(self)
+
+    def _simulate_latency(self):
+        if self.latency:
+            time.sleep(random.uniform(0.5, 1.5) * self.latency / 1000.0)
+
+    def _create_message(self, to, sender_name, message):
+        self._simulate_latency()
+        recipients = list(to) if isinstance(to, (list, tuple)) else [to]
+        failed = random.random() < self.error_rate
+        messageid = None if failed else str(uuid.uuid4())
+
+        with _lock:
+            _records.append({
+                'time': time.time(),
+                'messageid': messageid,
+                'sender_name': sender_name,
+                'recipients': len(recipients),
+                'length': len(message or ''),
+                'error': failed,
+            })
+        _count(self.dbname, requests=1, recipients=len(recipients), errors=int(failed))
+
+        if failed:
+            return SinkResponse(500, {'message': 'Simulated server error (shadow transport)'})
+        if self.callback_url:
+            self._schedule_callbacks(messageid, recipients)
+        return SinkResponse(201, {'messageid': messageid, 'url': ''})
+
+    def _schedule_callbacks(self, messageid, recipients):
+        due = time.monotonic() + self.callback_delay
+        dropped = 0
+        with _wakeup:
+            for recipient in recipients:
+                if len(_callbacks) >= CALLBACK_QUEUE_SIZE:
+                    dropped += 1
+                    continue
+                payload = {
+                    'messageid': messageid,
+                    'contact': '+' + recipient,
+                    'status': 'failed' if random.random() < self.failure_rate else 'received',
+                    'error': 'Simulated delivery failure (shadow transport)',
+                    'metadata': {'message_type': 'API', 'shadow': True},
+                }
+                heapq.heappush(_callbacks, (
+                    due, next(_sequence), self.dbname, self.callback_url, self.callback_secret, payload))
+            _start_dispatcher()
+            _wakeup.notify()
+        if dropped:
+            _logger.warning(f"Nimba SMS sink callback queue full, dropped {dropped} delivery reports")
+            _count(self.dbname, callbacks_dropped=dropped)
+
+
+def _start_dispatcher():
+    """Start the dispatcher thread of this process if needed; call with ``_lock`` held."""
+    global _dispatcher
+    if _dispatcher is None:
+        _dispatcher = threading.Thread(target=_dispatch, name='nimba_sink', daemon=True)
+        _dispatcher.start()
+
+
+def _count(dbname, **deltas):
+    """Add counter deltas, flushed to the database by the dispatcher thread."""
+    if not dbname:
+        return
+    with _lock:
+        _pending_counts[dbname].update(deltas)
+        _start_dispatcher()
+
+
+def _dispatch():
+    """Post the synthetic delivery reports once due and flush the counters."""
+    last_flush = time.monotonic()
+    with requests.Session() as session:
+        while True:
+            with _wakeup:
+                timeout = last_flush + FLUSH_INTERVAL - time.monotonic()
+                if _callbacks:
+                    timeout = min(timeout, _callbacks[0][0] - time.monotonic())
+                if timeout > 0:
+                    _wakeup.wait(timeout)
+                due = []
+                now = time.monotonic()
+                while _callbacks and _callbacks[0][0] <= now:
+                    due.append(heapq.heappop(_callbacks))
+            try:
+                for _due, _sequence_number, dbname, url, secret, payload in due:
+                    ok = _post_callback(session, url, secret, payload)
+                    _count(dbname, callbacks=1, callback_errors=int(not ok))
+                if time.monotonic() - last_flush >= FLUSH_INTERVAL:
+                    last_flush = time.monotonic()
+                    flush()
+            except Exception:
+                _logger.exception("Nimba SMS sink dispatcher failed")
+
+
+def _post_callback(session, url, secret, payload):
+    """POST one synthetic delivery report to the webhook; return whether it was accepted."""
+    body = json.dumps(payload).encode()
+    headers = {'Content-Type': 'application/json'}
+    if secret:
+        headers['X-SMS-Signature'] = hmac.new(secret.encode('utf-8'), body, hashlib.sha256).hexdigest()
+    try:
+        return session.post(url, data=body, headers=headers, timeout=10).ok
+    except requests.RequestException as e:
+        _logger.warning(f"Nimba SMS sink callback failed: {str(e)}")
+        return False
+
+
+def flush(dbname=None):
+    """
+    Add the counter deltas of this process to the database (all databases
+    when ``dbname`` is not given). Deltas that cannot be written, e.g. while
+    another worker updates the same counters, are kept for the next flush.
+    """
+    with _lock:
+        dbnames = [dbname] if dbname else list(_pending_counts)
+        pending = {db: _pending_counts.pop(db) for db in dbnames if db in _pending_counts}
+    if not pending:
+        return
+
+    from odoo import SUPERUSER_ID, api
+    from odoo.modules.registry import Registry
+
+    for db, deltas in pending.items():
+        deltas = {name: delta for name, delta in deltas.items() if delta}
+        if not deltas:
+            continue
+        try:
+            with Registry(db).cursor() as cr:
+                api.Environment(cr, SUPERUSER_ID, {})['sms.nimba.sink.counter']._add(deltas)
+        except Exception as e:
+            if not isinstance(e, (pg_errors.SerializationFailure, pg_errors.LockNotAvailable)):
+                _logger.warning(f"Nimba SMS sink counters of '{db}' not flushed: {str(e)}")
+            with _lock:
+                _pending_counts[db].update(deltas)
+
+
+def get_stats(dbname):
+    """Return the counters of the database and the most recent requests of this process."""
+    from odoo import SUPERUSER_ID, api
+    from odoo.modules.registry import Registry
+
+    flush(dbname)
+    with Registry(dbname).cursor() as cr:
+        values = api.Environment(cr, SUPERUSER_ID, {})['sms.nimba.sink.counter']._get_values()
+    counters = {name: values.get(name, 0) for name in COUNTERS}
+    with _lock:
+        return counters, list(_records)
+
+
+def reset(dbname):
+    """Clear the counters of the database and the requests recorded by this process."""
+    from odoo import SUPERUSER_ID, api
+    from odoo.modules.registry import Registry
+
+    with _lock:
+        _records.clear()
+        _pending_counts.pop(dbname, None)
+    with Registry(dbname).cursor() as cr:
+        api.Environment(cr, SUPERUSER_ID, {})['sms.nimba.sink.counter']._reset()
@@ -1,22 +1,18 @@
 # -*- coding: utf-8 -*-
 
 import logging
-import phonenumbers
-from phonenumbers import NumberParseException
+import time
 
 from odoo import _
 from odoo.addons.sms.tools.sms_api import SmsApiBase
 
-try:
-    from nimbasms import Client, NimbaSMSException
-except ImportError:
-    _logger = logging.getLogger(__name__)
-    _logger.warning("nimbasms library not found. Please install it: pip install nimbasms")
-    Client = None
-    NimbaSMSException = Exception
+from . import nimba_blocklist, nimba_profiler, nimba_sdk, nimba_sink
 
 _logger = logging.getLogger(__name__)
 
+# Result states meaning the account itself is unusable (drained from the pool)
+NIMBA_DRAIN_STATES = ('nimba_auth_error', 'nimba_insufficient_balance')
+
 
 class SmsApiNimba(SmsApiBase):
     """
@@ -29,163 +25,503 @@ class SmsApiNimba(SmsApiBase):
         'nimba_auth_error': 'sms_credit',
         'nimba_invalid_sender': 'sms_number_format',
         'nimba_insufficient_balance': 'sms_credit',
+        'nimba_blacklisted': 'sms_blacklist',
+        'nimba_optout': 'sms_optout',
     }
 
-    def _format_phone_number(self, number, default_country='GN'):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Nimba API calls not sent to the circuit breaker yet, see ``_flush_nimba_calls``
+        self._nimba_calls = {'calls': 0, 'failures': 0, 'latency': 0.0, 'error': None}
+
+    def _get_nimba_default_country(self):
+        """Country code national numbers are parsed in: the company's, or Guinea."""
+        company = self.company or self.env.company
+        return company.sudo().country_id.code or 'GN'
+
+    def _format_phone_number(self, number, default_country=None, strict=False):
         """
         Format phone number to E.164 international format without '+' prefix.
 
         Nimba SMS SDK expects numbers in international format without the '+' sign.
         Example: '224620000000' for Guinea, not '+224620000000'
+
+        :param default_country: country code of national numbers; defaults to
+                                the company's country
+        :param strict: return False instead of the raw number when it is invalid
         """
+        phonenumbers = nimba_sdk.get_phonenumbers()
         try:
-            parsed = phonenumbers.parse(number, default_country)
+            parsed = phonenumbers.parse(number, default_country or self._get_nimba_default_country())
+            if not phonenumbers.is_valid_number(parsed) and (number or '').strip().isdigit():
+                # International number stored without its '+', e.g. '221771234567'
+                parsed = phonenumbers.parse('+' + number.strip())
             if not phonenumbers.is_valid_number(parsed):
                 _logger.warning(f"Invalid phone number: {number}")
-                return number
+                return False if strict else number
             # Format to E.164 and remove the '+' prefix
             formatted = phonenumbers.format_number(parsed, phonenumbers.PhoneNumberFormat.E164)
             return formatted.lstrip('+')
-        except NumberParseException as e:
+        except phonenumbers.NumberParseException as e:
             _logger.warning(f"Error parsing phone number {number}: {str(e)}")
-            return number
+            return False if strict else number
+
+    def _prepare_nimba_messages(self, messages):
+        """
+        Format the recipients of a batch and reject the ones that cannot be
+        delivered before any network call.
+
+        Numbers failing local validation are rejected right away; the
+        remaining numbers of the whole batch are checked against the invalid
+        number registry in a single query.
+
+        :param messages: list of message dicts with 'content' and 'numbers'
+        :return: tuple (prepared, rejected) where prepared is a list of
+                 (body, phone_numbers, uuid_map) and rejected a list of
+                 result dicts for the rejected recipients
+        """
+        InvalidNumber = self.env['sms.nimba.invalid.number'].sudo()
+        rejected = []
+        formatted_messages = []
+        default_country = self._get_nimba_default_country()
+
+        for message in messages:
+            formatted = []
+            for num_info in message.get('numbers') or []:
+                formatted_num = self._format_phone_number(num_info['number'], default_country, strict=True)
+                if formatted_num:
+                    formatted.append((formatted_num, num_info['uuid']))
+                else:
+                    rejected.append({
+                        'uuid': num_info['uuid'],
+                        'state': 'wrong_number_format',
+                        'failure_reason': _("Invalid phone number: %s") % num_info['number'],
+                    })
+            formatted_messages.append((message.get('content') or '', formatted))
+
+        known_invalid = InvalidNumber._filter_known_invalid(
+            number for _body, formatted in formatted_messages for number, _uuid in formatted
+        )
+
+        prepared = []
+        for body, formatted in formatted_messages:
+            phone_numbers = []
+            uuid_map = {}  # Map phone_number -> uuid
+            for formatted_num, uuid in formatted:
+                if formatted_num in known_invalid:
+                    rejected.append({
+                        'uuid': uuid,
+                        'state': 'wrong_number_format',
+                        'failure_reason': _("Number registered as invalid or undeliverable"),
+                    })
+                    continue
+                phone_numbers.append(formatted_num)
+                uuid_map[formatted_num] = uuid
+            if phone_numbers:
+                prepared.append((body, phone_numbers, uuid_map))
+
+        if rejected:
+            _logger.info(f"Nimba SMS: {len(rejected)} recipients rejected before sending")
+        return prepared, rejected
+
+    def _filter_blocked_recipients(self, prepared):
+        """
+        Drop blacklisted and opted-out recipients from prepared messages.
+
+        All numbers of the batch are checked at once: directly against
+        ``phone.blacklist`` and the company opt-out list with one indexed
+        query, or, for very large lists, against an in-memory membership
+        filter first so that only possible hits, and the numbers blocked
+        since the filter was built, reach the database.
+
+        :param prepared: list of (body, phone_numbers, uuid_map) tuples
+        :return: tuple (prepared, rejected) like ``_prepare_nimba_messages``
+        """
+        numbers = {number for _body, phone_numbers, _uuid_map in prepared for number in phone_numbers}
+        if not numbers:
+            return prepared, []
+
+        company = self.company or self.env.company
+        ICP = self.env['ir.config_parameter'].sudo()
+        bloom = nimba_blocklist.get_filter(
+            self.env.cr,
+            company.id,
+            threshold=int(ICP.get_param('sms.nimba_blocklist_filter_threshold', 20000)),
+            ttl=int(ICP.get_param('sms.nimba_blocklist_filter_ttl', 300)),
+        )
+        if bloom is not None:
+            recent = nimba_blocklist.get_recent_numbers(self.env.cr, company.id, bloom.built_at)
+            numbers = {number for number in numbers if number in bloom or number in recent}
+        blocked = self._get_blocked_numbers(company, numbers) if numbers else {}
+        if not blocked:
+            return prepared, []
+
+        kept, rejected = [], []
+        for body, phone_numbers, uuid_map in prepared:
+            remaining = []
+            for number in phone_numbers:
+                if number in blocked:
+                    rejected.append({
+                        'uuid': uuid_map[number],
+                        'state': blocked[number],
+                        'failure_reason': False,
+                    })
+                else:
+                    remaining.append(number)
+            if remaining:
+                kept.append((body, remaining, uuid_map))
+        _logger.info(f"Nimba SMS: {len(rejected)} blacklisted or opted-out recipients skipped")
+        return kept, rejected
+
+    def _get_blocked_numbers(self, company, numbers):
+        """
+        Look ``numbers`` up in ``phone.blacklist`` and the company opt-out list.
+
+        :param numbers: set of numbers in API format (digits only)
+        :return: dict number -> result state ('nimba_blacklisted' or 'nimba_optout')
+        """
+        numbers = list(numbers)
+        self.env.cr.execute("""
+            SELECT ltrim(number, '+'), 'nimba_blacklisted'
+              FROM phone_blacklist
+             WHERE active AND number = ANY(%s)
+         UNION ALL
+            SELECT number, 'nimba_optout'
+              FROM sms_nimba_optout
+             WHERE company_id = %s AND number = ANY(%s)
+        """, [['+' + number for number in numbers], company.id, numbers])
+        blocked = {}
+        for number, state in self.env.cr.fetchall():
+            blocked.setdefault(number, state)
+        return blocked
 
+    @nimba_profiler.timed('_send_sms_batch')
     def _send_sms_batch(self, messages, delivery_reports_url=False):
         """
         Send a batch of SMS using Nimba SMS official SDK.
 
+        When the company has an account pool, each message is sent through
+        the account picked by the pool strategy; accounts failing with an
+        authentication or balance error are drained and the message is
+        retried on the next healthy account.
+
+        API calls are counted in memory and sent to the circuit breaker once
+        at the end of the batch, or before the next message when one failed:
+        once the breaker trips, the remaining messages get no result and
+        their SMS stay ``outgoing`` for a later run.
+
         :param messages: list of message dicts with 'content' and 'numbers'
         :param delivery_reports_url: callback URL for delivery reports
         :return: list of result dicts with state and uuid
         """
-        # Check if SDK is available
-        if Client is None:
-            _logger.error("Nimba SMS SDK not installed. Please run: pip install nimbasms")
-            return [{
-                'uuid': num_info['uuid'],
-                'state': 'server_error',
-                'failure_reason': _("Nimba SMS SDK not installed"),
-            } for msg in messages for num_info in msg.get('numbers', [])]
+        configuration_errors = self._check_nimba_configuration(messages)
+        if configuration_errors is not None:
+            return configuration_errors
+
+        company_sudo = (self.company or self.env.company).sudo()
+        accounts = self._get_nimba_accounts()
+
+        with nimba_profiler.section('_prepare_nimba_messages'):
+            prepared, res = self._prepare_nimba_messages(messages)
+        with nimba_profiler.section('_filter_blocked_recipients'):
+            prepared, blocked = self._filter_blocked_recipients(prepared)
+        res += blocked
+
+        # Process each message
+        try:
+            for index, (body, phone_numbers, uuid_map) in enumerate(prepared):
+                if self._nimba_calls['failures'] and self._flush_nimba_calls():
+                    unsent = sum(len(numbers) for _body, numbers, _uuid_map in prepared[index:])
+                    _logger.warning(f"Nimba SMS circuit breaker tripped, keeping {unsent} SMS of the batch queued")
+                    break
 
-        # Get company configuration
+                if accounts is None:
+                    res += self._send_nimba_message(
+                        company_sudo.sms_nimba_service_id,
+                        company_sudo.sms_nimba_secret_token,
+                        company_sudo.sms_nimba_sender_name,
+                        body, phone_numbers, uuid_map,
+                    )
+                    continue
+
+                # Pool mode: fail over to the next account when one gets drained
+                while True:
+                    account = self.env['sms.nimba.account']._select_account(
+                        accounts, company_sudo.sms_nimba_pool_strategy, count=len(phone_numbers))
+                    results = self._send_nimba_message(
+                        account.service_id, account.secret_token, account.sender_name,
+                        body, phone_numbers, uuid_map, account=account,
+                    )
+                    error_state = results[0]['state'] if results else 'success'
+                    if error_state not in NIMBA_DRAIN_STATES:
+                        res += results
+                        break
+                    account._drain(results[0]['failure_reason'])
+                    accounts -= account
+                    if not accounts:
+                        res += results
+                        break
+        finally:
+            self._flush_nimba_calls()
+
+        return res
+
+    def _check_nimba_configuration(self, messages, require_sdk=True):
+        """
+        Check that the company can send through Nimba SMS.
+
+        :param require_sdk: whether requests go through the Nimba SDK (the
+                            ``nimba_sender`` command uses its own HTTP client)
+        :return: None when it can, otherwise a failed result for every
+                 recipient of ``messages``
+        """
         company_sudo = (self.company or self.env.company).sudo()
 
-        service_id = company_sudo.sms_nimba_service_id
-        secret_token = company_sudo.sms_nimba_secret_token
-        sender_name = company_sudo.sms_nimba_sender_name
+        # Check if SDK is available (the shadow transport does not need it)
+        if require_sdk and company_sudo.sms_nimba_transport != 'shadow' and nimba_sdk.get_sdk()[0] is None:
+            _logger.error("Nimba SMS SDK not installed. Please run: pip install nimbasms")
+            return self._get_failed_results(messages, _("Nimba SMS SDK not installed"))
 
-        if not service_id or not secret_token or not sender_name:
+        if company_sudo._has_nimba_account_pool():
+            if not company_sudo._get_nimba_account_pool():
+                _logger.error(f"All Nimba SMS accounts of company {company_sudo.id} are drained")
+                return self._get_failed_results(
+                    messages, _("All Nimba SMS accounts are drained"), state='nimba_auth_error')
+        elif (not company_sudo.sms_nimba_service_id or not company_sudo.sms_nimba_secret_token
+              or not company_sudo.sms_nimba_sender_name):
             _logger.error("Nimba SMS Provider not configured properly")
-            return [{
-                'uuid': num_info['uuid'],
-                'state': 'server_error',
-                'failure_reason': _("Provider not configured: missing Service ID, Secret Token, or Sender Name"),
-            } for msg in messages for num_info in msg.get('numbers', [])]
+            return self._get_failed_results(
+                messages, _("Provider not configured: missing Service ID, Secret Token, or Sender Name"))
+        return None
+
+    def _get_nimba_accounts(self):
+        """
+        Return the healthy pooled accounts of the company, or None when the
+        company sends through its single account.
+        """
+        company_sudo = (self.company or self.env.company).sudo()
+        if company_sudo._has_nimba_account_pool():
+            return company_sudo._get_nimba_account_pool()
+        return None
+
+    def _send_nimba_message(self, service_id, secret_token, sender_name, body, phone_numbers, uuid_map,
+                            account=None):
+        """
+        Send one message to several recipients with a given set of credentials.
 
-        # Initialize Nimba SMS client
+        :param account: sms.nimba.account used for the request, if any
+        :return: list of result dicts, one per recipient
+        """
+        NimbaSMSException = nimba_sdk.get_sdk()[1]
+
+        # Get the pooled Nimba SMS client (or the local sink in shadow mode)
         try:
-            client = Client(service_id, secret_token)
+            client = self._get_nimba_client(service_id, secret_token)
         except NimbaSMSException as e:
             _logger.error(f"Failed to initialize Nimba SMS client: {e}")
+            return self._get_message_failed_results(
+                phone_numbers, uuid_map, 'server_error',
+                _("Failed to initialize Nimba SMS client: %s") % str(e))
+
+        start = time.monotonic()
+        try:
+            # Send SMS batch via SDK
+            # Nimba SMS SDK supports sending to multiple recipients in one request
+            response = client.messages.create(
+                to=phone_numbers,
+                sender_name=sender_name,
+                message=body
+            )
+            nimba_profiler.add_network(time.monotonic() - start)
+            self._record_nimba_call(time.monotonic() - start, failed=response.status_code >= 500,
+                                    error=None if response.status_code < 500 else response.text)
+            try:
+                response_data = response.data
+            except Exception:
+                response_data = None
+            return self._get_nimba_results(
+                response.status_code, response_data, response.text, phone_numbers, uuid_map, account=account)
+
+        except NimbaSMSException as e:
+            _logger.error(f"Nimba SMS SDK exception: {e}")
+            nimba_profiler.add_network(time.monotonic() - start)
+            self._record_nimba_call(time.monotonic() - start, failed=True, error=str(e))
+            return self._get_message_failed_results(phone_numbers, uuid_map, 'server_error', str(e))
+        except Exception as e:
+            _logger.error(f"Unexpected error sending SMS batch: {str(e)}", exc_info=True)
+            self._record_nimba_call(time.monotonic() - start, failed=True, error=str(e))
+            return self._get_message_failed_results(phone_numbers, uuid_map, 'server_error', str(e))
+
+    def _get_nimba_results(self, status_code, response_data, response_text, phone_numbers, uuid_map,
+                           account=None):
+        """
+        Turn a Nimba API response to a message into per-recipient results.
+
+        :param status_code: HTTP status code of the response
+        :param response_data: decoded JSON body, if any
+        :param response_text: raw body
+        :param account: sms.nimba.account used for the request, if any
+        :return: list of result dicts, one per recipient
+        """
+        if status_code < 400:
+            # Success: all messages sent
+            _logger.info(f"Nimba SMS batch sent successfully: {response_data}")
+
+            # Extract messageid from Nimba response for webhook tracking
+            # Response format: {"messageid": "uuid", "url": "..."}
+            nimba_messageid = (response_data or {}).get('messageid')
+
+            # Mark all as success (will be mapped to 'pending' state by Odoo)
+            # The webhook will then update to 'sent' when actually delivered
+            # NOTE: If Nimba API returns individual status per number,
+            # this logic should be updated to parse that
             return [{
-                'uuid': num_info['uuid'],
-                'state': 'server_error',
-                'failure_reason': _("Failed to initialize Nimba SMS client: %s") % str(e),
-            } for msg in messages for num_info in msg.get('numbers', [])]
+                'uuid': uuid_map[phone],
+                'state': 'success',  # Mapped to 'pending' by Odoo core
+                'sms_nimba_sid': nimba_messageid,  # Store messageid for webhook matching
+                'sms_nimba_account_id': account.id if account else False,
+                'failure_reason': False,
+                'failure_type': False,
+            } for phone in phone_numbers]
 
-        res = []
+        # Global error: all messages failed
+        if isinstance(response_data, dict):
+            error_msg = response_data.get('message', response_text)
+        else:
+            error_msg = response_text or _("No error details available")
 
-        # Process each message
-        for message in messages:
-            body = message.get('content') or ''
-            numbers_info = message.get('numbers') or []
+        _logger.error(f"Nimba SMS error (status {status_code}): {error_msg}")
+        return self._get_message_failed_results(
+            phone_numbers, uuid_map, self._get_nimba_error_state(status_code, error_msg), error_msg)
 
-            # Prepare list of formatted phone numbers and UUID mapping
-            phone_numbers = []
-            uuid_map = {}  # Map phone_number -> uuid
+    @staticmethod
+    def _get_message_failed_results(phone_numbers, uuid_map, state, failure_reason):
+        """Return a failed result for every recipient of one message."""
+        return [{
+            'uuid': uuid_map[phone],
+            'state': state,
+            'failure_type': state,
+            'failure_reason': failure_reason,
+        } for phone in phone_numbers]
 
-            for num_info in numbers_info:
-                formatted_num = self._format_phone_number(num_info['number'])
-                phone_numbers.append(formatted_num)
-                uuid_map[formatted_num] = num_info['uuid']
+    # ------------------------------------------------------------------
+    # CIRCUIT BREAKER
+    # ------------------------------------------------------------------
 
-            if not phone_numbers:
-                continue
+    def _nimba_circuit_allows(self):
+        """Whether the company's circuit breaker lets requests reach the Nimba API."""
+        company_sudo = (self.company or self.env.company).sudo()
+        return self.env['sms.nimba.circuit']._allow_request(company_sudo, self._probe_nimba_api)
 
-            try:
-                # Send SMS batch via SDK
-                # Nimba SMS SDK supports sending to multiple recipients in one request
-                response = client.messages.create(
-                    to=phone_numbers,
-                    sender_name=sender_name,
-                    message=body
-                )
-
-                if response.ok:
-                    # Success: all messages sent
-                    response_data = response.data
-
-                    _logger.info(f"Nimba SMS batch sent successfully: {response_data}")
-
-                    # Extract messageid from Nimba response for webhook tracking
-                    # Response format: {"messageid": "uuid", "url": "..."}
-                    nimba_messageid = response_data.get('messageid')
-
-                    # Mark all as success (will be mapped to 'pending' state by Odoo)
-                    # The webhook will then update to 'sent' when actually delivered
-                    # NOTE: If Nimba API returns individual status per number,
-                    # this logic should be updated to parse that
-                    for phone in phone_numbers:
-                        uuid = uuid_map[phone]
-                        res.append({
-                            'uuid': uuid,
-                            'state': 'success',  # Mapped to 'pending' by Odoo core
-                            'sms_nimba_sid': nimba_messageid,  # Store messageid for webhook matching
-                            'failure_reason': False,
-                            'failure_type': False,
-                        })
-                else:
-                    # Global error: all messages failed
-                    error_msg = _("Unknown error")
-                    try:
-                        error_data = response.data
-                        error_msg = error_data.get('message', response.text)
-                    except Exception:
-                        error_msg = response.text or _("No error details available")
-
-                    _logger.error(f"Nimba SMS error (status {response.status_code}): {error_msg}")
-
-                    for phone in phone_numbers:
-                        uuid = uuid_map[phone]
-                        res.append({
-                            'uuid': uuid,
-                            'state': 'server_error',
-                            'failure_type': 'server_error',
-                            'failure_reason': error_msg,
-                        })
-
-            except NimbaSMSException as e:
-                _logger.error(f"Nimba SMS SDK exception: {e}")
-                for phone in phone_numbers:
-                    uuid = uuid_map[phone]
-                    res.append({
-                        'uuid': uuid,
-                        'state': 'server_error',
-                        'failure_type': 'server_error',
-                        'failure_reason': str(e),
-                    })
-            except Exception as e:
-                _logger.error(f"Unexpected error sending SMS batch: {str(e)}", exc_info=True)
-                for phone in phone_numbers:
-                    uuid = uuid_map[phone]
-                    res.append({
-                        'uuid': uuid,
-                        'state': 'server_error',
-                        'failure_type': 'server_error',
-                        'failure_reason': str(e),
-                    })
+    def _record_nimba_call(self, latency, failed, error=None):
+        """
+        Count the outcome of a Nimba API call, sent to the company's circuit
+        breaker by the next ``_flush_nimba_calls``. Slow calls count as failed.
+        """
+        if not failed and latency > self.env['sms.nimba.circuit']._get_circuit_params()['latency']:
+            failed, error = True, f"Slow response ({latency:.1f}s)"
+        calls = self._nimba_calls
+        calls['calls'] += 1
+        calls['failures'] += int(failed)
+        calls['latency'] = latency
+        if failed:
+            calls['error'] = error or calls['error']
 
-        return res
+    def _flush_nimba_calls(self):
+        """
+        Send the calls counted since the last flush to the company's circuit
+        breaker, in one transaction.
+
+        :return: True if the breaker refuses requests
+        """
+        calls = self._nimba_calls
+        if not calls['calls']:
+            return False
+        self._nimba_calls = {'calls': 0, 'failures': 0, 'latency': 0.0, 'error': None}
+        company_sudo = (self.company or self.env.company).sudo()
+        return self.env['sms.nimba.circuit']._record_calls(
+            company_sudo, calls['calls'], calls['failures'], calls['latency'], error=calls['error'])
+
+    def _probe_nimba_api(self):
+        """
+        Check that the Nimba API answers, using the company's credentials.
+
+        Any response below 500 (including authentication errors, which are
+        handled by draining accounts) means the API itself is reachable.
+
+        :return: True if the API answered in time
+        """
+        company_sudo = (self.company or self.env.company).sudo()
+        if company_sudo._has_nimba_account_pool():
+            account = company_sudo._get_nimba_account_pool()[:1]
+            credentials = (account.service_id, account.secret_token)
+        else:
+            credentials = (company_sudo.sms_nimba_service_id, company_sudo.sms_nimba_secret_token)
+        if not all(credentials):
+            return False
+        if company_sudo.sms_nimba_transport != 'shadow' and nimba_sdk.get_sdk()[0] is None:
+            return False
+
+        start = time.monotonic()
+        response = self._get_nimba_client(*credentials).accounts.get()
+        latency = time.monotonic() - start
+        nimba_profiler.add_network(latency)
+        max_latency = self.env['sms.nimba.circuit']._get_circuit_params()['latency']
+        _logger.info(f"Nimba SMS probe answered {response.status_code} in {latency:.2f}s")
+        return response.status_code < 500 and latency <= max_latency
+
+    def _get_nimba_client(self, service_id, secret_token):
+        """
+        Return the client used to reach Nimba SMS for the company.
+
+        In shadow transport mode, requests go to a local sink recording
+        them, with simulated latency, errors and delivery callbacks.
+        """
+        company_sudo = (self.company or self.env.company).sudo()
+        if company_sudo.sms_nimba_transport != 'shadow':
+            return nimba_sdk.get_client(service_id, secret_token)
+
+        callback_url = False
+        if company_sudo.sms_nimba_sink_callbacks:
+            base_url = self.env['ir.config_parameter'].sudo().get_param('web.base.url', '')
+            callback_url = f"{base_url.rstrip('/')}/sms/webhook/nimba/{self.env.cr.dbname}"
+        return nimba_sink.SinkClient(
+            latency=company_sudo.sms_nimba_sink_latency,
+            error_rate=company_sudo.sms_nimba_sink_error_rate,
+            callback_url=callback_url,
+            callback_secret=self.env['ir.config_parameter'].sudo().get_param('sms.nimba_webhook_secret'),
+            callback_delay=company_sudo.sms_nimba_sink_callback_delay,
+            failure_rate=company_sudo.sms_nimba_sink_failure_rate,
+            dbname=self.env.cr.dbname,
+        )
+
+    @staticmethod
+    def _get_nimba_error_state(status_code, error_msg):
+        """
+        Classify a failed Nimba API response.
+
+        Authentication and balance errors are account-level problems: the
+        account pool drains the account and retries on another one.
+
+        :param status_code: HTTP status code of the response
+        :param error_msg: error message returned by the API
+        :return: result state ('nimba_auth_error', 'nimba_insufficient_balance' or 'server_error')
+        """
+        if status_code in (401, 403):
+            return 'nimba_auth_error'
+        message = (error_msg or '').lower()
+        if status_code == 402 or any(word in message for word in ('balance', 'solde', 'credit', 'crédit')):
+            return 'nimba_insufficient_balance'
+        return 'server_error'
+
+    @staticmethod
+    def _get_failed_results(messages, failure_reason, state='server_error'):
+        """Return a failed result for every recipient of ``messages``."""
+        return [{
+            'uuid': num_info['uuid'],
+            'state': state,
+            'failure_reason': failure_reason,
+        } for msg in messages for num_info in msg.get('numbers', [])]
 
     def _get_sms_api_error_messages(self):
         """Return error messages for different failure types."""
@@ -194,8 +530,35 @@ class SmsApiNimba(SmsApiBase):
             'nimba_auth_error': _("Authentication error - check API credentials"),
             'nimba_invalid_sender': _("Invalid sender name - verify it's approved"),
             'nimba_insufficient_balance': _("Insufficient balance in your account"),
+            'nimba_blacklisted': _("The number is blacklisted"),
+            'nimba_optout': _("The recipient opted out of SMS"),
             'wrong_number_format': _("Invalid phone number format"),
             'server_error': _("Server error - please try again"),
             'unknown': _("Unknown error - contact support"),
         })
         return error_dict
+
+
+class SmsApiNimbaResults(SmsApiNimba):
+    """
+    Nimba SMS API stand-in returning results computed beforehand.
+
+    Used to apply the results of requests sent outside of ``sms.sms._send``
+    (e.g. by the standalone ``nimba_sender`` command) through the regular
+    ``_send`` post-processing and ``_handle_call_result_hook``, without any
+    new API call.
+    """
+
+    def __init__(self, env, results):
+        super().__init__(env)
+        self._results = {result['uuid']: result for result in results}
+
+    def _nimba_circuit_allows(self):
+        return True
+
+    def _send_sms_batch(self, messages, delivery_reports_url=False):
+        return [
+            self._results[num_info['uuid']]
+            for message in messages for num_info in message.get('numbers', [])
+            if num_info['uuid'] in self._results
+        ]